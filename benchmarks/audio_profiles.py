@@ -0,0 +1,107 @@
+"""
+Benchmark the download audio profiles against each other.
+
+Downloads the same videos with each profile (bypassing the caches) and reports
+download time, file size (also per hour of audio), how many Whisper uploads the
+file needs and, unless --skip-transcription is given, the transcription time.
+With several videos the totals per profile are printed as well.
+
+Usage:
+    python -m benchmarks.audio_profiles -u "https://www.youtube.com/watch?v=VIDEO_ID"
+    python -m benchmarks.audio_profiles -u URL1 URL2 URL3 --skip-transcription
+"""
+
+from projectY_modules import downloader
+from projectY_modules import transcriber
+from projectY_modules import audio_splitter
+
+import argparse
+import logging
+import time
+import os
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare download audio profiles for size and transcription time.")
+    parser.add_argument("-u", "--urls", nargs="+", required=True, help="YouTube video URLs to benchmark")
+    parser.add_argument("-p", "--profiles", nargs="+", choices=downloader.AUDIO_PROFILES, default=downloader.AUDIO_PROFILES, help="Profiles to compare")
+    parser.add_argument("--skip-transcription", action="store_true", help="Only measure download and size (no Whisper cost)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
+    return parser.parse_args()
+
+def benchmark_profile(url, profile, transcribe):
+    """Download (and optionally transcribe) a video with one profile and return the measurements."""
+    start = time.perf_counter()
+    audio_file = downloader.download_audio(url, profile=profile, use_cache=False)
+    download_seconds = time.perf_counter() - start
+
+    metadata = downloader.get_video_metadata(url) or {}
+    hours = (metadata.get("duration") or 0) / 3600
+
+    result = {
+        "video": metadata.get("video_id") or url,
+        "profile": profile,
+        "file": audio_file,
+        "download_seconds": download_seconds,
+        "size_mb": os.path.getsize(audio_file) / 1024 / 1024,
+        "hours": hours,
+        "uploads": None,
+        "transcription_seconds": None,
+        "transcript_chars": None
+    }
+
+    if audio_splitter.FFMPEG_AVAILABLE:
+        plan = audio_splitter.plan_chunks_for_file(audio_file, transcriber.WHISPER_MAX_FILE_SIZE)
+        result["uploads"] = len(plan)
+
+    if transcribe:
+        start = time.perf_counter()
+        transcript = transcriber.transcribe_audio(audio_file, use_cache=False)
+        result["transcription_seconds"] = time.perf_counter() - start
+        result["transcript_chars"] = len(transcript)
+
+    return result
+
+def format_value(value, fmt):
+    return "-" if value is None else format(value, fmt)
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    results = [
+        benchmark_profile(url, profile, not args.skip_transcription)
+        for url in args.urls
+        for profile in args.profiles
+    ]
+
+    print(f"{'Video':<14}{'Profile':<10}{'Download s':>12}{'Size MB':>10}{'MB/hour':>10}{'Uploads':>9}{'Transcribe s':>14}{'Chars':>9}")
+    for result in results:
+        print(
+            f"{result['video']:<14}{result['profile']:<10}"
+            f"{format_value(result['download_seconds'], '.1f'):>12}"
+            f"{format_value(result['size_mb'], '.2f'):>10}"
+            f"{format_value(result['size_mb'] / result['hours'] if result['hours'] else None, '.1f'):>10}"
+            f"{format_value(result['uploads'], 'd'):>9}"
+            f"{format_value(result['transcription_seconds'], '.1f'):>14}"
+            f"{format_value(result['transcript_chars'], 'd'):>9}"
+        )
+
+    if len(args.urls) > 1:
+        print(f"\n{'Total':<14}{'Profile':<10}{'Download s':>12}{'Size MB':>10}{'MB/hour':>10}{'Uploads':>9}{'Transcribe s':>14}")
+        for profile in args.profiles:
+            measured = [result for result in results if result["profile"] == profile]
+            hours = sum(result["hours"] for result in measured)
+            size_mb = sum(result["size_mb"] for result in measured)
+            uploads = [result["uploads"] for result in measured]
+            transcription = [result["transcription_seconds"] for result in measured]
+            print(
+                f"{len(measured):<14}{profile:<10}"
+                f"{sum(result['download_seconds'] for result in measured):>12.1f}"
+                f"{size_mb:>10.2f}"
+                f"{format_value(size_mb / hours if hours else None, '.1f'):>10}"
+                f"{format_value(None if None in uploads else sum(uploads), 'd'):>9}"
+                f"{format_value(None if None in transcription else sum(transcription), '.1f'):>14}"
+            )
+
+if __name__ == "__main__":
+    main()
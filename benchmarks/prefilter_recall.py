@@ -0,0 +1,121 @@
+"""
+Benchmark the prediction pre-filter's recall against its savings.
+
+Runs the pre-filter over labelled transcripts at several thresholds and reports
+how many of the labelled predictions survive (recall) and how much smaller the
+text sent to the extraction model becomes. No API calls are made.
+
+The labels that matter come from real transcripts: --from-store uses the
+transcripts in the prediction store that were analyzed without the pre-filter,
+labelled with the predictions the extraction model found in the full text. The
+bundled samples are a small hand-written smoke test, written alongside the cue
+patterns, and say little about recall on real episodes.
+
+Usage:
+    python -m benchmarks.prefilter_recall --from-store
+    python -m benchmarks.prefilter_recall --from-store -t 1.5 2.5 3.5 -c 0 1 2
+    python -m benchmarks.prefilter_recall
+"""
+
+from projectY_modules import prediction_prefilter
+from projectY_modules import prediction_dedupe
+from projectY_modules import prediction_store
+from projectY_modules import token_budget
+
+import argparse
+import json
+import os
+
+DEFAULT_SAMPLES = os.path.join(os.path.dirname(__file__), "data", "prefilter_samples.json")
+
+# Share of a labelled prediction's content words that must appear in a kept
+# sentence and its neighbour: extracted predictions paraphrase the speaker
+MIN_WORD_COVERAGE = 0.6
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure pre-filter recall and token savings on labelled transcripts.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("-f", "--samples", default=DEFAULT_SAMPLES, help="JSON file of labelled transcripts (default: the bundled smoke-test samples)")
+    source.add_argument("-s", "--from-store", action="store_true", help="Use the transcripts and extracted predictions of analyses in the prediction store")
+    parser.add_argument("-n", "--limit", type=int, help="With --from-store, only the most recent this many transcripts")
+    parser.add_argument("-t", "--thresholds", nargs="+", type=float, default=[1.0, 1.5, 2.0, 2.5, 3.0, 3.5], help="Score thresholds to try")
+    parser.add_argument("-c", "--context", nargs="+", type=int, default=[0, 1, 2], help="Context sentence counts to try")
+    parser.add_argument("-v", "--verbose", action="store_true", help="List the labelled predictions each setting drops")
+    return parser.parse_args()
+
+def _words(text):
+    return set(prediction_dedupe.normalize(text).split()) - prediction_dedupe.STOPWORDS
+
+def _is_kept(prediction, kept_windows):
+    """Whether a labelled prediction survives: some kept sentence, together with the
+    next one, holds at least MIN_WORD_COVERAGE of its content words."""
+    words = _words(prediction)
+    if not words:
+        return True
+    return any(len(words & window) >= MIN_WORD_COVERAGE * len(words) for window in kept_windows)
+
+def benchmark_setting(samples, threshold, context):
+    """Pre-filter every sample with one setting and return the totals."""
+    result = {
+        "threshold": threshold,
+        "context": context,
+        "labelled": 0,
+        "kept": 0,
+        "original_tokens": 0,
+        "kept_tokens": 0,
+        "missed": []
+    }
+
+    for sample in samples:
+        reduced, _ = prediction_prefilter.prefilter_transcript(sample["transcript"], threshold=threshold, context=context)
+        sentences = [_words(sentence) for sentence in prediction_prefilter.split_sentences(reduced)]
+        kept_windows = [sentence | (sentences[i + 1] if i + 1 < len(sentences) else set()) for i, sentence in enumerate(sentences)]
+
+        for prediction in sample["predictions"]:
+            result["labelled"] += 1
+            if _is_kept(prediction, kept_windows):
+                result["kept"] += 1
+            else:
+                result["missed"].append(f"{sample['name']}: {prediction}")
+
+        result["original_tokens"] += token_budget.count_tokens(sample["transcript"])
+        result["kept_tokens"] += token_budget.count_tokens(reduced)
+
+    return result
+
+def main():
+    args = parse_args()
+
+    if args.from_store:
+        samples = prediction_store.labelled_transcripts(args.limit)
+        if not samples:
+            print("No stored transcripts analyzed without the pre-filter; analyze some videos first")
+            return
+    else:
+        with open(args.samples, "r", encoding="utf-8") as f:
+            samples = json.load(f)
+
+    results = [
+        benchmark_setting(samples, threshold, context)
+        for threshold in args.thresholds
+        for context in args.context
+    ]
+
+    print(f"{len(samples)} transcripts, {results[0]['labelled'] if results else 0} labelled predictions")
+    print(f"{'Threshold':>10}{'Context':>9}{'Recall %':>10}{'Tokens':>9}{'Saved %':>9}")
+    for result in results:
+        recall = 100 * result["kept"] / result["labelled"] if result["labelled"] else 0.0
+        saved = 100 * (1 - result["kept_tokens"] / result["original_tokens"]) if result["original_tokens"] else 0.0
+        print(
+            f"{result['threshold']:>10.1f}"
+            f"{result['context']:>9d}"
+            f"{recall:>10.1f}"
+            f"{result['kept_tokens']:>9d}"
+            f"{saved:>9.1f}"
+        )
+        if args.verbose:
+            for missed in result["missed"]:
+                print(f"    missed {missed}")
+
+if __name__ == "__main__":
+    main()
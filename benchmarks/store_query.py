@@ -0,0 +1,82 @@
+"""
+Benchmark prediction store queries at back-catalogue scale.
+
+Fills a throwaway store with synthetic videos and predictions, then times the
+searches the query CLI runs: full-text, by channel and rating, and the
+per-channel counts. No API calls are made.
+
+Usage:
+    python -m benchmarks.store_query
+    python -m benchmarks.store_query -n 200000 -r 20
+"""
+
+from projectY_modules import prediction_store
+from projectY_modules import results
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+SUBJECTS = ["Bitcoin", "Tesla", "Apple", "the Fed", "inflation", "Argentina", "Real Madrid", "the Lakers", "OpenAI", "gold", "oil", "the euro"]
+OUTCOMES = ["will double", "will crash", "will win the title", "will cut rates", "will hit a record high", "will miss its targets", "will be banned", "will merge"]
+WHEN = ["next year", "in 2026", "by the end of 2027", "within five years", "this summer", "before the election"]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time prediction store searches on a large synthetic store.")
+    parser.add_argument("-n", "--predictions", type=int, default=100000, help="Number of predictions to store")
+    parser.add_argument("-p", "--per-video", type=int, default=25, help="Predictions per video")
+    parser.add_argument("-r", "--repeat", type=int, default=10, help="Times each query is run")
+    return parser.parse_args()
+
+def fill_store(total, per_video):
+    """Store total synthetic predictions across videos from 40 channels."""
+    rng = random.Random(0)
+    for start in range(0, total, per_video):
+        video_index = start // per_video
+        verification_results = [
+            results.VerificationResult(
+                prediction=f"{rng.choice(SUBJECTS)} {rng.choice(OUTCOMES)} {rng.choice(WHEN)}",
+                actual="Synthetic verdict",
+                rating=rng.choice(results.RATINGS)
+            )
+            for _ in range(min(per_video, total - start))
+        ]
+        video = {
+            "video_id": f"video{video_index:06d}",
+            "channel": f"Channel {video_index % 40}",
+            "upload_date": f"20{20 + video_index % 6}-0{1 + video_index % 9}-15"
+        }
+        prediction_store.save_analysis(video["video_id"], f"Video {video_index}", verification_results, video=video)
+
+def time_query(label, func, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        matched = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"{label:<45}{len(matched):>8}{statistics.median(timings):>12.2f}{max(timings):>10.2f}")
+
+def main():
+    args = parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        prediction_store.STORE_PATH = os.path.join(directory, "projecty.sqlite3")
+
+        started = time.perf_counter()
+        fill_store(args.predictions, args.per_video)
+        print(f"Stored {args.predictions} predictions in {time.perf_counter() - started:.1f}s (FTS5: {prediction_store.FTS5_AVAILABLE})\n")
+
+        print(f"{'Query':<45}{'Rows':>8}{'Median ms':>12}{'Max ms':>10}")
+        time_query("full text 'bitcoin crash'", lambda: prediction_store.search_predictions("bitcoin crash"), args.repeat)
+        time_query("full text 'fed rates' on one channel", lambda: prediction_store.search_predictions("fed rates", channel="channel 7"), args.repeat)
+        time_query("rating TRUE since 2024", lambda: prediction_store.search_predictions(rating="TRUE", since="2024-01-01"), args.repeat)
+        time_query("latest predictions", lambda: prediction_store.search_predictions(), args.repeat)
+        time_query("counts per channel for 'tesla'", lambda: prediction_store.count_predictions("tesla"), args.repeat)
+        time_query("counts per channel, everything", lambda: prediction_store.count_predictions(), args.repeat)
+        time_query("due for re-check", lambda: prediction_store.due_predictions(limit=1000), args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,23 @@
 from projectY_modules import config
 from projectY_modules import downloader 
+from projectY_modules import audio_preprocessor
 from projectY_modules import transcriber
 from projectY_modules import prediction_extractor
 from projectY_modules import prediction_verifier
 from projectY_modules import narrative_generator
+from projectY_modules import results
+from projectY_modules import transcript_cache
+from projectY_modules import token_budget
+from projectY_modules import resilience
+from projectY_modules import hedging
+from projectY_modules import prediction_dates
+from projectY_modules import prediction_store
+from projectY_modules import utilities
 
 import argparse
 import sys
 import os
+import time
 import logging
 
 def setup_logging(verbose):
@@ -43,20 +53,167 @@ def parse_args():
     group = parser.add_mutually_exclusive_group()
     group.add_argument("-t", "--transcript", help="Path to a local transcript text file")
     group.add_argument("-u", "--url", help="YouTube video URL to download audio from")
+    group.add_argument("--recheck", action="store_true", help="Re-verify the stored NOT YET and UNCLEAR predictions that are due, instead of analyzing a video.")
+    parser.add_argument("--recheck-limit", type=int, help="Re-check at most this many due predictions, earliest due first.")
+    parser.add_argument("--regenerate-narratives", action="store_true", help="With --recheck, regenerate the narratives of videos where a verdict changed.")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
     parser.add_argument("-i", "--intro-file", type=str, help="Optional path to a file with introductory context for the transcript.")
+    parser.add_argument("-s", "--transcript-source", choices=config.TRANSCRIPT_SOURCES, default=config.TRANSCRIPT_SOURCE, help="Use YouTube captions, prefer captions and fall back to audio, or always transcribe the audio.")
+    parser.add_argument("-a", "--audio-profile", choices=downloader.AUDIO_PROFILES, default=config.AUDIO_PROFILE, help="Download audio as 192 kbps MP3 (default) or low-bitrate mono speech.")
+    parser.add_argument("-b", "--backend", choices=list(transcriber.TRANSCRIPTION_BACKENDS), default=config.TRANSCRIPTION_BACKEND, help="Transcribe with the OpenAI Whisper API or a local CPU Whisper model.")
+    parser.add_argument("--trim-silence", action="store_true", help="Remove long silences from the audio before transcription.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed up the audio before transcription (1.0-2.0).")
+    parser.add_argument("-e", "--extraction-mode", choices=config.EXTRACTION_MODES, default=config.EXTRACTION_MODE, help="Extract predictions in one prompt, in parallel transcript windows, or automatically by length.")
+    parser.add_argument("--prefilter", action="store_true", default=config.PREFILTER_ENABLED, help="Only send transcript passages with prediction cues to the extraction model.")
+    parser.add_argument("--no-prefilter", dest="prefilter", action="store_false", help="Send the whole transcript to the extraction model even if PROJECTY_PREFILTER=1.")
+    parser.add_argument("--no-dedupe", dest="dedupe", action="store_false", default=config.DEDUPE_ENABLED, help="Verify every prediction separately instead of once per group of near-duplicates.")
+    parser.add_argument("--no-verify-cache", dest="verify_cache", action="store_false", default=config.VERIFY_CACHE_ENABLED, help="Verify every prediction again instead of reusing cached verdicts.")
+    parser.add_argument("--verify-batch-size", type=int, default=config.VERIFY_BATCH_SIZE, help="Verify up to this many predictions per Perplexity request (1 = one request each).")
+    parser.add_argument("--no-tiered", dest="tiered", action="store_false", default=config.VERIFY_TIERED, help="Send every prediction to the reasoning model instead of trying the fast model first.")
+    parser.add_argument("--hedge", action="store_true", default=config.VERIFY_HEDGE_ENABLED, help="Resend verification requests that run past the usual latency and use whichever answer arrives first.")
+    parser.add_argument("--no-hedge", dest="hedge", action="store_false", help="Never resend slow verification requests, even if PROJECTY_VERIFY_HEDGE=1.")
+    parser.add_argument("--no-date-check", dest="date_check", action="store_false", default=config.DATE_CHECK_ENABLED, help="Verify predictions about future periods too instead of answering them NOT YET locally.")
+    parser.add_argument("-w", "--verify-workers", type=int, default=config.VERIFY_MAX_WORKERS, help="Maximum number of predictions verified concurrently.")
     return parser.parse_args()
 
+def transcribe_video(url, args):
+    """Return the transcript, title and metadata (or None) of a YouTube video.
+
+    A cached transcript is used when available. Otherwise args.transcript_source
+    decides between YouTube captions ("captions"), captions with audio fallback
+    ("prefer-captions") and downloading plus transcribing the audio ("audio"),
+    optionally with silence trimming and speed-up before transcription."""
+    logger = logging.getLogger(__name__)
+
+    video_id = utilities.extract_video_id(url)
+    video = downloader.get_video_metadata(url)
+    cached = transcript_cache.get_by_video_id(video_id)
+    if cached:
+        logger.info(f"Using cached transcript for video: {video_id}")
+        return cached["transcript"], cached["title"] or video_id, video
+
+    if args.transcript_source in ("captions", "prefer-captions"):
+        try:
+            captions = downloader.fetch_captions(url)
+        except Exception as e:
+            # Captions are only a shortcut unless they were asked for explicitly
+            if args.transcript_source == "captions":
+                raise
+            logger.warning(f"Could not fetch captions ({str(e)}), falling back to audio transcription")
+            captions = None
+        if captions:
+            logger.info("Using YouTube captions as transcript")
+            return captions["transcript"], utilities.sanitize_filename(captions["title"]), video
+        if args.transcript_source == "captions":
+            raise ValueError("No captions are available for this video. Use --transcript-source audio to transcribe it instead.")
+        logger.info("No captions available, falling back to audio transcription")
+
+    logger.info(f"Downloading audio from: {url}")
+    audio_file = downloader.download_audio(url, profile=args.audio_profile)
+    video_title = os.path.splitext(os.path.basename(audio_file))[0]
+
+    if args.trim_silence or args.speed != 1.0:
+        audio_file, stats = audio_preprocessor.preprocess_audio(audio_file, trim_silence=args.trim_silence, speed=args.speed)
+        print(
+            f"Preprocessing removed {stats['seconds_removed']:.1f}s of {stats['original_seconds']:.1f}s "
+            f"({stats['percent_removed']:.1f}%) and {stats['bytes_removed']/1024/1024:.2f}MB"
+        )
+
+    transcribed_text = transcriber.transcribe_audio(audio_file, video_id=video_id, title=video_title, backend=args.backend)
+    return transcribed_text, video_title, video
+
+def verify_options(args):
+    """Keyword arguments for prediction_verifier.verify_predictions from the command line."""
+    return {
+        "max_workers": args.verify_workers,
+        "dedupe": args.dedupe,
+        "use_cache": args.verify_cache,
+        "batch_size": args.verify_batch_size,
+        "tiered": args.tiered,
+        "hedge": args.hedge,
+        "date_check": args.date_check
+    }
+
+def recheck_predictions(args):
+    """Re-verify the stored open predictions that are due, across all analyzed videos.
+
+    Only due NOT YET and UNCLEAR predictions are sent, in one bulk verification.
+    With args.regenerate_narratives, videos where a rating changed get a new narrative."""
+    due = prediction_store.due_predictions(limit=args.recheck_limit)
+    if not due:
+        print("No predictions are due for a re-check")
+        return
+
+    print(f"Re-checking {len(due)} due predictions from {len({item['video_key'] for item in due})} videos")
+    verification_results = prediction_verifier.verify_predictions(
+        [item["prediction"] for item in due],
+        reference_date=[prediction_dates.parse_upload_date(item["upload_date"]) for item in due],
+        **verify_options(args)
+    )
+    changed_videos = prediction_store.update_verdicts(due, verification_results)
+
+    print("\n" + "="*50)
+    print("Changed Verdicts")
+    print("="*50 + "\n")
+    for item, result in zip(due, verification_results):
+        if result.rating != item["rating"] and not result.error:
+            print(f"{item['prediction']}")
+            print(f"    {item['rating']} -> {result.rating}: {result.actual}\n")
+
+    counts = results.count_ratings(verification_results)
+    print(", ".join(f"{rating}: {count}" for rating, count in counts.items()))
+    print(f"Verdicts changed in {len(changed_videos)} videos")
+    failed = sum(1 for result in verification_results if result.error)
+    if failed:
+        print(f"{failed} re-checks failed; their verdicts were kept and will be re-checked in {config.RECHECK_INTERVAL_DAYS} days")
+
+    if args.regenerate_narratives:
+        for key in sorted(changed_videos):
+            video = prediction_store.load_video(key)
+            narrative = narrative_generator.generate_narrative(
+                video_title=video["title"],
+                intro_text=video["intro_text"] or "",
+                verified_results=video["results"],
+                video=video
+            )
+            prediction_store.save_narrative(key, narrative)
+            print(f"Regenerated narrative for: {video['title']}")
+
+def print_run_stats():
+    """Print the token usage and API retry sections that end every run."""
+    print("\n" + "="*50)
+    print("Token Usage\n" + "="*50)
+    print(token_budget.format_usage(token_budget.usage_summary()))
+
+    print("\n" + "="*50)
+    print("API Retries\n" + "="*50)
+    print(resilience.format_stats(resilience.stats_summary()))
+
 def main():
     args = parse_args()
     setup_logging(args.verbose)
     logger = logging.getLogger(__name__)
+    # Fail before any download or transcription if an API key is missing
+    config.validate_and_load_env_vars()
 
     sys.stdout.reconfigure(encoding='utf-8')
     intro_text = ""
     video_title = "Unknown Video"
+    video = None
+    url = None
+    # Seconds spent in each pipeline stage, stored with the analysis
+    timings = {}
+    token_budget.start_run()
+    resilience.start_run()
+    hedging.start_run()
 
     try:
+        if args.recheck:
+            recheck_predictions(args)
+            print_run_stats()
+            return
+
+        stage_started = time.perf_counter()
         if args.transcript:
             with open(args.transcript, "r", encoding="utf-8") as f:
                 transcribed_text = f.read()
@@ -64,17 +221,13 @@ def main():
             video_title = os.path.splitext(os.path.basename(args.transcript))[0]
 
         elif args.url:
-            logger.info(f"Downloading audio from: {args.url}")
-            audio_file = downloader.download_audio(args.url)
-            transcribed_text = transcriber.transcribe_audio(audio_file)
-            video_title = os.path.splitext(os.path.basename(audio_file))[0]
+            url = args.url
+            transcribed_text, video_title, video = transcribe_video(url, args)
 
         else:
             url = input("Enter the YouTube video URL: ")
-            logger.info(f"Downloading audio from: {url}")
-            audio_file = downloader.download_audio(url)
-            transcribed_text = transcriber.transcribe_audio(audio_file)
-            video_title = os.path.splitext(os.path.basename(audio_file))[0]
+            transcribed_text, video_title, video = transcribe_video(url, args)
+        timings["transcription"] = time.perf_counter() - stage_started
 
         if args.intro_file:
             if os.path.exists(args.intro_file):
@@ -84,53 +237,71 @@ def main():
             else:
                 logger.warning(f"Intro file not found: {args.intro_file}")
 
+        stage_started = time.perf_counter()
         prediction_list = prediction_extractor.extract_predictions(
             transcribed_text, 
-            intro=intro_text
+            intro=intro_text,
+            mode=args.extraction_mode,
+            prefilter=args.prefilter
         )
+        timings["extraction"] = time.perf_counter() - stage_started
         
-        verified_results = {}
-        for prediction in prediction_list:
-            logger.info(f"\nAnalyzing prediction: {prediction}")
-            logger.info("Asking Perplexity to verify...")
-
-            gpt_response = prediction_verifier.verify_prediction_with_perplexity(prediction)
-            
-            actual_result = "Not found"
-            rating = "UNCLEAR"
-            
-            for line in gpt_response.splitlines():
-                if line.strip().lower().startswith("actual result:"):
-                    actual_result = line.split(":", 1)[1].strip()
-                elif line.strip().lower().startswith("rating:"):
-                    rating = line.split(":", 1)[1].strip()
-            
-            verified_results[prediction] = {
-                "actual": actual_result,
-                "rating": rating
-            }
+        logger.info("Asking Perplexity to verify predictions...")
+        stage_started = time.perf_counter()
+        verification_results = prediction_verifier.verify_predictions(
+            prediction_list,
+            reference_date=prediction_dates.parse_upload_date(video and video.get("upload_date")),
+            **verify_options(args)
+        )
+        timings["verification"] = time.perf_counter() - stage_started
+        if args.verify_cache:
+            cache_hits, cache_misses = results.count_cache_hits(verification_results)
+            print(f"Verification cache: {cache_hits} hits, {cache_misses} misses")
+        print(f"Settled by model: {results.format_model_counts(results.count_models(verification_results))}")
+        if args.hedge:
+            print(f"Hedging: {hedging.format_stats(hedging.stats_summary())}")
 
         # Print final results (keeping these as prints for clear output formatting)
         print("\n" + "="*50)
         print("Final Verified Predictions")
         print("="*50 + "\n")
         
-        for i, (pred, details) in enumerate(verified_results.items(), start=1):
-            print(f"Prediction {i}: {pred}")
-            print(f"    Actual Result: {details['actual']}")
-            print(f"    Rating: {details['rating']}\n")
+        for i, result in enumerate(verification_results, start=1):
+            print(f"Prediction {i}: {result.prediction}")
+            print(f"    Actual Result: {result.actual}")
+            print(f"    Rating: {result.rating}")
+            if result.recheck_at:
+                print(f"    Re-check on: {result.recheck_at}")
+            print()
         
         print("="*50)
 
         # Generate and display podcast-style narrative
         print("Podcast-Style Narrative\n" + "="*50)
+        stage_started = time.perf_counter()
         narrative = narrative_generator.generate_narrative(
             video_title=video_title,
             intro_text=intro_text,
-            verified_results=verified_results
+            verified_results=verification_results,
+            video=video
         )
+        timings["narrative"] = time.perf_counter() - stage_started
         print(narrative)
 
+        prediction_store.save_analysis(
+            prediction_store.video_key(utilities.extract_video_id(url) if url else None, transcribed_text),
+            video_title,
+            verification_results,
+            narrative=narrative,
+            video=video,
+            intro_text=intro_text,
+            transcript=transcribed_text,
+            timings=timings,
+            prefiltered=args.prefilter
+        )
+
+        print_run_stats()
+
     except Exception as e:
         logger.error(f"An error occurred: {str(e)}", exc_info=True)
         sys.exit(1)
@@ -0,0 +1,96 @@
+"""
+Audio preprocessing for ProjectY.
+Optional stage between downloading and transcription that removes silence and
+time-compresses speech, so fewer seconds of audio are sent to Whisper.
+"""
+
+import os
+import logging
+from projectY_modules import audio_splitter
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# Audio below this level counts as silence
+SILENCE_THRESHOLD_DB = -40
+
+# Only pauses longer than this are cut, so normal gaps between words survive
+MIN_SILENCE_SECONDS = 1.0
+
+# Silence left in place of each removed pause, so sentences do not run together
+KEPT_SILENCE_SECONDS = 0.3
+
+# Speech stays intelligible to Whisper up to roughly this speed-up
+MAX_SPEED = 2.0
+
+def build_filters(trim_silence=True, speed=1.0):
+    """Return the ffmpeg audio filter chain for the requested preprocessing."""
+    if speed < 1.0 or speed > MAX_SPEED:
+        raise ValueError(f"Speed must be between 1.0 and {MAX_SPEED}, got {speed}")
+
+    filters = []
+    if trim_silence:
+        # Energy-based voice activity gate: drop every pause longer than MIN_SILENCE_SECONDS
+        filters.append(
+            "silenceremove="
+            f"start_periods=1:start_duration=0:start_threshold={SILENCE_THRESHOLD_DB}dB:"
+            f"stop_periods=-1:stop_duration={MIN_SILENCE_SECONDS}:stop_threshold={SILENCE_THRESHOLD_DB}dB:"
+            f"stop_silence={KEPT_SILENCE_SECONDS}"
+        )
+    if speed != 1.0:
+        # atempo changes speed without changing pitch
+        filters.append(f"atempo={speed}")
+    return filters
+
+def preprocess_audio(file_path, trim_silence=True, speed=1.0):
+    """Remove silence from and optionally speed up an audio file before transcription.
+
+    Writes the result next to the input in the speech encoding and returns
+    (output_path, stats), where stats reports the seconds and bytes removed.
+    With nothing to do the input is returned unchanged."""
+    filters = build_filters(trim_silence, speed)
+    if not filters:
+        return file_path, _build_stats(file_path, file_path)
+
+    if not audio_splitter.FFMPEG_AVAILABLE:
+        raise ValueError("ffmpeg is not available. Cannot preprocess audio.")
+
+    base_name = os.path.splitext(file_path)[0]
+    suffix = ("-trimmed" if trim_silence else "") + (f"-x{speed:g}" if speed != 1.0 else "")
+    output_path = f"{base_name}{suffix}{audio_splitter.SPEECH_ENCODING_EXT}"
+
+    # Reuse the output of an earlier run with the same settings
+    if os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(file_path):
+        logger.info(f"Using previously preprocessed audio: {output_path}")
+    else:
+        logger.info(f"Preprocessing audio (trim silence: {trim_silence}, speed: {speed}x)...")
+        audio_splitter.transcode_audio(file_path, output_path, filters=filters)
+
+    stats = _build_stats(file_path, output_path)
+    logger.info(
+        f"Preprocessing removed {stats['seconds_removed']:.1f}s "
+        f"({stats['percent_removed']:.1f}% of the audio) and {stats['bytes_removed']/1024/1024:.2f}MB"
+    )
+    return output_path, stats
+
+def _build_stats(original_path, processed_path):
+    """Compare the original and processed files by duration and size."""
+    original_size = os.path.getsize(original_path)
+    processed_size = os.path.getsize(processed_path)
+
+    if audio_splitter.FFMPEG_AVAILABLE:
+        original_seconds = audio_splitter.probe_audio(original_path)["duration"]
+        processed_seconds = original_seconds if processed_path == original_path else audio_splitter.probe_audio(processed_path)["duration"]
+    else:
+        original_seconds = processed_seconds = 0.0
+
+    seconds_removed = max(0.0, original_seconds - processed_seconds)
+    return {
+        "original_seconds": original_seconds,
+        "processed_seconds": processed_seconds,
+        "seconds_removed": seconds_removed,
+        "percent_removed": 100 * seconds_removed / original_seconds if original_seconds else 0.0,
+        "original_bytes": original_size,
+        "processed_bytes": processed_size,
+        "bytes_removed": original_size - processed_size
+    }
@@ -0,0 +1,205 @@
+"""
+Audio splitting and encoding for ProjectY.
+Cuts compressed audio files into segments by streaming them through ffmpeg,
+so long episodes are never decoded into memory, and re-encodes audio into
+compact speech-oriented formats.
+"""
+
+import os
+import glob
+import json
+import math
+import shutil
+import logging
+import tempfile
+import subprocess
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# ffmpeg and ffprobe are needed for probing and splitting
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None and shutil.which("ffprobe") is not None
+if not FFMPEG_AVAILABLE:
+    logging.warning("ffmpeg/ffprobe not available. Large file splitting will be disabled.")
+
+# ffmpeg output options for speech recognition: mono 16 kHz Opus at a low bitrate in an Ogg container
+SPEECH_ENCODING_ARGS = ["-vn", "-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k", "-application", "voip"]
+SPEECH_ENCODING_EXT = ".ogg"
+
+# Fraction of the upload limit a planned chunk may use, leaving room for VBR peaks and container overhead
+CHUNK_SAFETY_RATIO = 0.9
+
+def probe_audio(file_path):
+    """Read duration, bitrate and stream layout of an audio file with ffprobe."""
+    logger.debug(f"Probing audio file: {file_path}")
+
+    command = [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "format=duration,bit_rate:stream=codec_name,sample_rate,channels,bit_rate",
+        "-of", "json",
+        file_path
+    ]
+
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"ffprobe failed for {file_path}: {e.stderr.strip()}")
+        raise
+
+    data = json.loads(completed.stdout)
+    fmt = data.get("format", {})
+    streams = data.get("streams") or [{}]
+    stream = streams[0]
+
+    # Prefer the audio stream bitrate, fall back to the container bitrate
+    bit_rate = stream.get("bit_rate") or fmt.get("bit_rate")
+
+    info = {
+        "duration": float(fmt.get("duration") or 0),
+        "bit_rate": int(bit_rate) if bit_rate else None,
+        "codec": stream.get("codec_name"),
+        "sample_rate": int(stream.get("sample_rate") or 0),
+        "channels": int(stream.get("channels") or 0),
+        "size": os.path.getsize(file_path)
+    }
+    logger.debug(f"Probe result: {info}")
+    return info
+
+def transcode_audio(input_path, output_path, encoding_args=SPEECH_ENCODING_ARGS, filters=None):
+    """Re-encode an audio file with ffmpeg, optionally through an audio filter chain.
+
+    ffmpeg decodes and encodes in a stream, so memory use stays flat. Returns output_path."""
+    if not FFMPEG_AVAILABLE:
+        raise ValueError("ffmpeg is not available. Cannot re-encode audio.")
+
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", input_path]
+    if filters:
+        command += ["-af", ",".join(filters)]
+    command += [*encoding_args, output_path]
+
+    logger.debug(f"Encoding {input_path} -> {output_path}")
+    try:
+        subprocess.run(command, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"ffmpeg failed to encode {input_path}: {e.stderr.strip()}")
+        raise
+
+    return output_path
+
+def plan_chunks(duration, bit_rate, max_bytes, safety_ratio=CHUNK_SAFETY_RATIO, max_seconds=None):
+    """Plan the fewest equal-length chunks whose encoded size fits under max_bytes.
+
+    duration is in seconds and bit_rate in bits per second of the encoded audio.
+    max_bytes may be None when only max_seconds limits the chunk length.
+    Returns a list of dicts with index, start, end (seconds) and estimated_bytes."""
+    if duration <= 0:
+        raise ValueError(f"Cannot plan chunks for audio with duration {duration}")
+    if max_bytes and (not bit_rate or bit_rate <= 0):
+        raise ValueError(f"Cannot plan chunks without a bitrate (got {bit_rate})")
+
+    bytes_per_second = (bit_rate or 0) / 8
+    chunk_count = 1
+    if max_bytes:
+        chunk_count = max(chunk_count, math.ceil(duration * bytes_per_second / (max_bytes * safety_ratio)))
+    if max_seconds:
+        chunk_count = max(chunk_count, math.ceil(duration / max_seconds))
+    chunk_seconds = duration / chunk_count
+
+    plan = []
+    for i in range(chunk_count):
+        start = i * chunk_seconds
+        end = duration if i == chunk_count - 1 else (i + 1) * chunk_seconds
+        plan.append({
+            "index": i,
+            "start": start,
+            "end": end,
+            "estimated_bytes": int((end - start) * bytes_per_second)
+        })
+
+    logger.debug(f"Planned {chunk_count} chunks of {chunk_seconds:.1f}s for {duration:.1f}s at {(bit_rate or 0)/1000:.0f} kbps")
+    return plan
+
+def plan_chunks_for_file(file_path, max_bytes, safety_ratio=CHUNK_SAFETY_RATIO, max_seconds=None):
+    """Probe an audio file and plan its chunks from the encoded bitrate."""
+    audio_info = probe_audio(file_path)
+    duration = audio_info["duration"]
+
+    # Average bitrate from file size is the most reliable figure for VBR files
+    bit_rate = audio_info["size"] * 8 / duration if duration else audio_info["bit_rate"]
+    if audio_info["bit_rate"]:
+        bit_rate = max(bit_rate, audio_info["bit_rate"])
+
+    return plan_chunks(duration, bit_rate, max_bytes, safety_ratio, max_seconds)
+
+def split_audio_by_plan(file_path, plan, output_dir=None):
+    """Split an audio file at the boundaries of a chunk plan from plan_chunks().
+
+    The audio stream is copied rather than re-encoded, so ffmpeg only reads the
+    compressed file sequentially and memory use does not grow with its length.
+    Returns the segment paths in playback order."""
+    logger.info(f"Splitting {file_path} into {len(plan)} planned chunks")
+
+    if len(plan) > 1:
+        boundaries = ",".join(f"{chunk['start']:.3f}" for chunk in plan[1:])
+        segment_args = ["-segment_times", boundaries]
+    else:
+        # A single segment longer than the whole file
+        segment_args = ["-segment_time", f"{plan[0]['end'] + 1:.3f}"]
+
+    return _run_segmenter(file_path, segment_args, output_dir)
+
+def split_to_fit(file_path, max_bytes, output_dir=None, safety_ratio=CHUNK_SAFETY_RATIO, max_seconds=None):
+    """Split an audio file into the fewest chunks that each fit under max_bytes and max_seconds.
+
+    Chunks that still come out too large (e.g. from a VBR peak) are split again
+    on their own. Returns the chunk paths in playback order."""
+    output_dir = output_dir or tempfile.mkdtemp(prefix="projectY_chunks_")
+    plan = plan_chunks_for_file(file_path, max_bytes, safety_ratio, max_seconds)
+    chunk_paths = split_audio_by_plan(file_path, plan, output_dir=output_dir)
+
+    if not max_bytes:
+        return chunk_paths
+
+    fitted_paths = []
+    for i, chunk_path in enumerate(chunk_paths):
+        if os.path.getsize(chunk_path) <= max_bytes:
+            fitted_paths.append(chunk_path)
+            continue
+
+        logger.warning(f"Chunk {chunk_path} exceeds {max_bytes/1024/1024:.0f}MB, splitting it again")
+        sub_dir = os.path.join(output_dir, f"part{i:04d}")
+        fitted_paths.extend(split_to_fit(chunk_path, max_bytes, output_dir=sub_dir, safety_ratio=safety_ratio * 0.9, max_seconds=max_seconds))
+
+    return fitted_paths
+
+def _run_segmenter(file_path, segment_args, output_dir):
+    """Run ffmpeg's segment muxer with stream copy and return the written segments."""
+    if not FFMPEG_AVAILABLE:
+        raise ValueError("ffmpeg is not available. Cannot split large files.")
+
+    ext = os.path.splitext(file_path)[1].lower() or ".mp3"
+    output_dir = output_dir or tempfile.mkdtemp(prefix="projectY_chunks_")
+    os.makedirs(output_dir, exist_ok=True)
+    output_pattern = os.path.join(output_dir, f"chunk%04d{ext}")
+
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", file_path,
+        "-map", "0:a:0",
+        "-c", "copy",
+        "-f", "segment",
+        *segment_args,
+        "-reset_timestamps", "1",
+        output_pattern
+    ]
+
+    try:
+        subprocess.run(command, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        logger.error(f"ffmpeg failed to split {file_path}: {e.stderr.strip()}")
+        raise
+
+    segments = sorted(glob.glob(os.path.join(output_dir, f"chunk*{ext}")))
+    logger.info(f"Split audio into {len(segments)} segments in {output_dir}")
+    return segments
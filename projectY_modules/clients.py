@@ -0,0 +1,91 @@
+"""
+Shared API clients for ProjectY.
+One OpenAI client and one Perplexity HTTP session per process, each with a
+keep-alive connection pool and explicit connect and read timeouts, so
+concurrent calls reuse open connections instead of paying a new TLS
+handshake per request.
+"""
+
+import threading
+import logging
+import openai
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from projectY_modules import config
+from projectY_modules.config import (
+    HTTP_POOL_SIZE,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT,
+    TRANSCRIBE_READ_TIMEOUT
+)
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+PERPLEXITY_API_URL = "https://api.perplexity.ai/chat/completions"
+
+# (connect, read) timeout passed to every Perplexity request
+PERPLEXITY_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+_clients = {}
+# Reentrant because the transcription client is derived from the shared client under the lock
+_clients_lock = threading.RLock()
+
+def _get_or_create(name, factory):
+    with _clients_lock:
+        if name not in _clients:
+            if config.OPENAI_API_KEY is None:
+                # Raises ValueError naming the missing API keys
+                config.validate_and_load_env_vars()
+            logger.debug(f"Creating shared {name} client")
+            _clients[name] = factory()
+        return _clients[name]
+
+def _create_openai_client():
+    http_client = openai.DefaultHttpxClient(
+        limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE),
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+    )
+    # Retries are left to resilience.call so every provider follows the same policy
+    return openai.OpenAI(api_key=config.OPENAI_API_KEY, http_client=http_client, max_retries=0)
+
+def _create_perplexity_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Authorization": f"Bearer {config.PERPLEXITY_API_KEY}",
+        "Accept": "application/json",
+        "Content-Type": "application/json"
+    })
+    return session
+
+def get_openai_client():
+    """Return the process-wide OpenAI client. It is safe to share between threads."""
+    return _get_or_create("openai", _create_openai_client)
+
+def get_transcription_client():
+    """Return the OpenAI client for audio uploads: the shared pool with a longer read timeout."""
+    return _get_or_create(
+        "openai-transcription",
+        lambda: get_openai_client().with_options(timeout=httpx.Timeout(TRANSCRIBE_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT))
+    )
+
+def openai_timeout(remaining, read_timeout=HTTP_READ_TIMEOUT):
+    """Per-request OpenAI timeout for a call with remaining seconds before its deadline.
+
+    Keeps the client's connect timeout and caps the read timeout, the way
+    PERPLEXITY_TIMEOUT is capped for Perplexity requests."""
+    return httpx.Timeout(min(read_timeout, remaining), connect=HTTP_CONNECT_TIMEOUT)
+
+def get_perplexity_session():
+    """Return the process-wide requests session for the Perplexity API, with auth headers set."""
+    return _get_or_create("perplexity", _create_perplexity_session)
+
+def close_all():
+    """Close every shared client, e.g. before the process exits."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
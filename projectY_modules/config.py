@@ -9,12 +9,117 @@ import logging
 # Set up logger for this module
 logger = logging.getLogger(__name__)
 
-# Module level variables initialized as None
+# Module level variables initialized as None; set by validate_and_load_env_vars
 OPENAI_API_KEY = None
 PERPLEXITY_API_KEY = None
 
+# Maximum number of prediction verifications sent to the API at the same time
+VERIFY_MAX_WORKERS = int(os.getenv("PROJECTY_VERIFY_WORKERS", "4"))
+
+# Maximum number of audio chunks uploaded to Whisper at the same time
+TRANSCRIBE_MAX_WORKERS = int(os.getenv("PROJECTY_TRANSCRIBE_WORKERS", "3"))
+
+# Number of times a failed chunk upload is retried before the transcription fails
+TRANSCRIBE_CHUNK_RETRIES = int(os.getenv("PROJECTY_TRANSCRIBE_RETRIES", "2"))
+
+# Transcription engine: "openai" (hosted whisper-1) or "local" (faster-whisper on CPU)
+TRANSCRIPTION_BACKEND = os.getenv("PROJECTY_TRANSCRIPTION_BACKEND", "openai")
+
+# Local Whisper model size, CTranslate2 compute type and the longest chunk it gets at once
+LOCAL_WHISPER_MODEL = os.getenv("PROJECTY_LOCAL_WHISPER_MODEL", "small")
+LOCAL_WHISPER_COMPUTE_TYPE = os.getenv("PROJECTY_LOCAL_WHISPER_COMPUTE_TYPE", "int8")
+LOCAL_WHISPER_CHUNK_SECONDS = int(os.getenv("PROJECTY_LOCAL_WHISPER_CHUNK_SECONDS", "600"))
+
+# Where video transcripts come from: "captions", "prefer-captions" or "audio"
+TRANSCRIPT_SOURCES = ["captions", "prefer-captions", "audio"]
+TRANSCRIPT_SOURCE = os.getenv("PROJECTY_TRANSCRIPT_SOURCE", "prefer-captions")
+
+# Caption languages to look for, in order of preference
+CAPTION_LANGUAGES = os.getenv("PROJECTY_CAPTION_LANGUAGES", "en").split(",")
+
+# Audio profile for downloads: "mp3" (192 kbps MP3) or "speech" (mono 16 kHz Opus).
+# "speech" stays opt-in until benchmarks/audio_profiles.py has been run on real videos
+AUDIO_PROFILE = os.getenv("PROJECTY_AUDIO_PROFILE", "mp3")
+
+# Prediction extraction mode: "auto" windows long transcripts, "single" always sends one prompt, "windowed" always windows
+EXTRACTION_MODES = ["auto", "single", "windowed"]
+EXTRACTION_MODE = os.getenv("PROJECTY_EXTRACTION_MODE", "auto")
+
+# Size and overlap (in tokens) of the transcript windows used for windowed extraction
+EXTRACTION_WINDOW_TOKENS = int(os.getenv("PROJECTY_EXTRACTION_WINDOW_TOKENS", "6000"))
+EXTRACTION_WINDOW_OVERLAP_TOKENS = int(os.getenv("PROJECTY_EXTRACTION_WINDOW_OVERLAP_TOKENS", "300"))
+
+# Maximum number of transcript windows sent for extraction at the same time
+EXTRACTION_MAX_WORKERS = int(os.getenv("PROJECTY_EXTRACTION_WORKERS", "4"))
+
+# Local pre-filter that only sends passages with prediction cues to the extraction model.
+# Off by default; the threshold and context are provisional until
+# benchmarks/prefilter_recall.py --from-store has been run on real transcripts
+PREFILTER_ENABLED = os.getenv("PROJECTY_PREFILTER", "0") == "1"
+PREFILTER_THRESHOLD = float(os.getenv("PROJECTY_PREFILTER_THRESHOLD", "2.5"))
+PREFILTER_CONTEXT_SENTENCES = int(os.getenv("PROJECTY_PREFILTER_CONTEXT", "1"))
+
+# Near-duplicate predictions are verified once; pairs whose content-word overlap (0-1) is at least this count as duplicates
+DEDUPE_ENABLED = os.getenv("PROJECTY_DEDUPE", "1") == "1"
+DEDUPE_THRESHOLD = float(os.getenv("PROJECTY_DEDUPE_THRESHOLD", "0.9"))
+
+# Retries for throttled (429) or failed (5xx, network) API calls, with exponential backoff between
+# RETRY_BASE_DELAY and RETRY_MAX_DELAY seconds unless the server sends Retry-After
+API_MAX_RETRIES = int(os.getenv("PROJECTY_API_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("PROJECTY_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("PROJECTY_RETRY_MAX_DELAY", "30"))
+
+# Time budget in seconds for one API call including its retries
+API_CALL_DEADLINE_SECONDS = float(os.getenv("PROJECTY_API_DEADLINE", "300"))
+
+# Consecutive failures that open a provider's circuit breaker, and how long it stays open
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("PROJECTY_CIRCUIT_FAILURES", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("PROJECTY_CIRCUIT_RESET_SECONDS", "60"))
+
+# Connection pool size and timeouts (seconds) of the shared API clients; audio uploads get a longer read timeout
+HTTP_POOL_SIZE = int(os.getenv("PROJECTY_HTTP_POOL_SIZE", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("PROJECTY_HTTP_CONNECT_TIMEOUT", "10"))
+HTTP_READ_TIMEOUT = float(os.getenv("PROJECTY_HTTP_READ_TIMEOUT", "120"))
+TRANSCRIBE_READ_TIMEOUT = float(os.getenv("PROJECTY_TRANSCRIBE_READ_TIMEOUT", "600"))
+
+# Directory holding the on-disk caches shared by the CLI and the Streamlit app
+CACHE_DIR = os.getenv("PROJECTY_CACHE_DIR", "cache")
+
+# Size limit of the transcript cache before least recently used entries are evicted
+TRANSCRIPT_CACHE_MAX_BYTES = int(os.getenv("PROJECTY_TRANSCRIPT_CACHE_MB", "200")) * 1024 * 1024
+
+# Predictions sent to Perplexity in one request; 1 verifies each prediction separately
+VERIFY_BATCH_SIZE = int(os.getenv("PROJECTY_VERIFY_BATCH_SIZE", "1"))
+
+# Tiered verification: try the fast model first and escalate UNCLEAR or low-confidence verdicts
+VERIFY_TIERED = os.getenv("PROJECTY_VERIFY_TIERED", "1") == "1"
+
+# Hedged verification: a slow request is duplicated once it runs past this percentile of
+# recent latencies (or HEDGE_INITIAL_DELAY_SECONDS until HEDGE_MIN_SAMPLES calls are timed)
+VERIFY_HEDGE_ENABLED = os.getenv("PROJECTY_VERIFY_HEDGE", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("PROJECTY_HEDGE_PERCENTILE", "95"))
+HEDGE_INITIAL_DELAY_SECONDS = float(os.getenv("PROJECTY_HEDGE_INITIAL_DELAY", "30"))
+HEDGE_MIN_SAMPLES = int(os.getenv("PROJECTY_HEDGE_MIN_SAMPLES", "10"))
+HEDGE_MAX_WORKERS = int(os.getenv("PROJECTY_HEDGE_WORKERS", "16"))
+
+# Answer predictions about a period that has not started yet as NOT YET without an API call,
+# to be re-checked this many days after the period ends
+DATE_CHECK_ENABLED = os.getenv("PROJECTY_DATE_CHECK", "1") == "1"
+DATE_RECHECK_GRACE_DAYS = int(os.getenv("PROJECTY_DATE_RECHECK_GRACE_DAYS", "7"))
+
+# Days until a stored NOT YET or UNCLEAR prediction without a known target date is re-checked
+RECHECK_INTERVAL_DAYS = int(os.getenv("PROJECTY_RECHECK_INTERVAL_DAYS", "7"))
+
+# Verification cache: TRUE/FALSE verdicts are kept, NOT YET/UNCLEAR ones expire after this many hours
+VERIFY_CACHE_ENABLED = os.getenv("PROJECTY_VERIFY_CACHE", "1") == "1"
+VERIFY_CACHE_PENDING_TTL_HOURS = float(os.getenv("PROJECTY_VERIFY_CACHE_TTL_HOURS", "24"))
+
 def validate_and_load_env_vars():
-    """Check that all required environment variables are set and load them into global variables."""
+    """Check that all required environment variables are set and load them into global variables.
+
+    Called when the first API client is created and at the start of a CLI run, not
+    on import, so local tools such as the store query CLI and the benchmarks run
+    without API keys."""
     global OPENAI_API_KEY, PERPLEXITY_API_KEY
     
     logger.debug("Starting environment variable validation")
@@ -44,6 +149,3 @@ def validate_and_load_env_vars():
         logger.debug(f"Loaded environment variable: {var}")
 
     logger.info("Successfully validated and loaded all environment variables")
-
-# Load environment variables when module is imported
-validate_and_load_env_vars() 
\ No newline at end of file
@@ -1,102 +1,194 @@
 from projectY_modules import utilities
+from projectY_modules import audio_splitter
+from projectY_modules.config import CACHE_DIR, CAPTION_LANGUAGES, AUDIO_PROFILE
 import os
+import re
+import html
+import time
+import threading
 import yt_dlp
 import logging
+from collections import OrderedDict
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
 
-def download_audio(youtube_url):
-    """Download audio from a YouTube URL and save as MP3."""
+DOWNLOAD_DIR = "downloads"
+
+# Maps YouTube video IDs to the audio files already downloaded for them
+DOWNLOAD_INDEX_PATH = os.path.join(CACHE_DIR, "downloads.json")
+
+# Metadata of probed videos, so a run from a cached transcript still knows the upload date
+VIDEO_METADATA_PATH = os.path.join(CACHE_DIR, "videos.json")
+
+# Audio containers Whisper accepts without conversion
+WHISPER_AUDIO_EXTS = ['m4a', 'webm', 'mp3', 'mp4']
+
+# Audio profiles: "mp3" keeps the 192 kbps MP3 output, "speech" produces mono 16 kHz Opus
+AUDIO_PROFILES = ["mp3", "speech"]
+
+# Lowest source bitrate (kbps) worth downloading for the speech profile
+SPEECH_MIN_SOURCE_ABR = 48
+
+# Caption track formats we know how to clean, in order of preference
+CAPTION_FORMATS = ['vtt', 'srt']
+
+_index_lock = threading.Lock()
+
+# Probe results by URL, so captions and audio download share a single metadata request.
+# The format URLs in a probe are signed and expire after a few hours, so a probe is
+# only reused for the length of an analysis, and only the latest few are kept.
+PROBE_CACHE_SECONDS = 600
+PROBE_CACHE_SIZE = 8
+_probe_cache = OrderedDict()
+_probe_lock = threading.Lock()
+
+def probe_video(youtube_url):
+    """Resolve a YouTube URL to its yt-dlp info dict, reusing a probe of the same URL
+    made within the last PROBE_CACHE_SECONDS."""
+    with _probe_lock:
+        cached = _probe_cache.get(youtube_url)
+        if cached and time.monotonic() - cached[0] < PROBE_CACHE_SECONDS:
+            logger.debug(f"Reusing probe result for: {youtube_url}")
+            return cached[1]
+        _probe_cache.pop(youtube_url, None)
+
+    with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+        info_dict = ydl.extract_info(youtube_url, download=False)  # Get video info without downloading
+
+    with _probe_lock:
+        _probe_cache[youtube_url] = (time.monotonic(), info_dict)
+        _probe_cache.move_to_end(youtube_url)
+        while len(_probe_cache) > PROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    return info_dict
+
+def video_metadata(info_dict):
+    """Pick the metadata ProjectY carries forward from a yt-dlp info dict.
+
+    upload_date is an ISO date ("YYYY-MM-DD") or None and duration is in seconds."""
+    upload_date = info_dict.get("upload_date")
+    if upload_date and len(upload_date) == 8:
+        upload_date = f"{upload_date[:4]}-{upload_date[4:6]}-{upload_date[6:]}"
+    return {
+        "video_id": info_dict.get("id"),
+        "title": info_dict.get("title"),
+        "channel": info_dict.get("channel") or info_dict.get("uploader"),
+        "upload_date": upload_date or None,
+        "duration": info_dict.get("duration"),
+        "url": info_dict.get("webpage_url")
+    }
+
+def get_video_metadata(youtube_url, use_cache=True):
+    """Return the metadata of a YouTube video (see video_metadata), or None if it cannot be fetched.
+
+    Metadata recorded by an earlier run is reused without a network request.
+    Metadata is optional for an analysis, so failures are logged, not raised."""
+    video_id = utilities.extract_video_id(youtube_url)
+    if use_cache and video_id:
+        with _index_lock:
+            cached = utilities.load_json(VIDEO_METADATA_PATH, {}).get(video_id)
+        if cached:
+            logger.debug(f"Using cached metadata for video {video_id}")
+            return cached
+
+    try:
+        metadata = video_metadata(probe_video(youtube_url))
+    except Exception as e:
+        logger.warning(f"Could not fetch video metadata: {str(e)}")
+        return None
+
+    if metadata["video_id"]:
+        with _index_lock:
+            index = utilities.load_json(VIDEO_METADATA_PATH, {})
+            index[metadata["video_id"]] = metadata
+            utilities.save_json_atomic(VIDEO_METADATA_PATH, index)
+    logger.info(f"Video metadata: channel {metadata['channel']}, uploaded {metadata['upload_date']}, {metadata['duration']}s")
+    return metadata
+
+def download_audio(youtube_url, profile=None, use_cache=True):
+    """Download audio from a YouTube URL in the given audio profile, reusing an earlier download of the same video.
+
+    The "speech" profile downloads the smallest adequate stream and re-encodes it to
+    mono 16 kHz Opus at 24 kbps, so long episodes need fewer Whisper uploads. The
+    "mp3" profile saves a 192 kbps MP3."""
+    profile = profile or AUDIO_PROFILE
+    if profile not in AUDIO_PROFILES:
+        raise ValueError(f"Unknown audio profile: {profile}. Choose from {', '.join(AUDIO_PROFILES)}")
+    if profile == "speech" and not audio_splitter.FFMPEG_AVAILABLE:
+        logger.warning("ffmpeg not available, falling back to the mp3 audio profile")
+        profile = "mp3"
+
     logger.info("Fetching video info...")
-    logger.debug(f"Processing URL: {youtube_url}")
+    logger.debug(f"Processing URL: {youtube_url} (profile: {profile})")
+
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
 
-    download_dir = "downloads"
-    os.makedirs(download_dir, exist_ok=True)
+    # Skip the network entirely if this video was already downloaded
+    if use_cache:
+        cached_path = get_cached_download(utilities.extract_video_id(youtube_url), profile)
+        if cached_path:
+            return cached_path
 
     try:
-        # Step 1: Extract video title before downloading
-        with yt_dlp.YoutubeDL({"quiet": True}) as ydl:
-            info_dict = ydl.extract_info(youtube_url, download=False)  # Get video info without downloading
-            video_title = info_dict.get("title", "audio")  # Get title
-            safe_title = utilities.sanitize_filename(video_title)  # Sanitize title
-        
+        # Step 1: Resolve the video once; the result drives format selection and the download
+        info_dict = probe_video(youtube_url)
+
+        video_id = info_dict.get("id")
+        if use_cache:
+            cached_path = get_cached_download(video_id, profile)
+            if cached_path:
+                return cached_path
+
+        video_title = info_dict.get("title", "audio")  # Get title
+        safe_title = utilities.sanitize_filename(video_title)  # Sanitize title
         logger.debug(f"Original title: {video_title}")
-        logger.info(f"Using sanitized filename: {safe_title}.mp3")
-
-        # Step 2: Define yt-dlp options with pre-sanitized filename
-        output_template = os.path.join(download_dir, f"{safe_title}.%(ext)s")
-
-        # Try different approaches for audio download
-        ydl_opts_list = [
-            # Option 1: Try to download MP3 directly (if available)
-            {
-                'format': 'bestaudio[ext=mp3]/bestaudio',
-                'outtmpl': output_template,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                "quiet": True,
-                "no_warnings": True
-            },
-            # Option 2: Download best audio and convert (requires FFmpeg)
-            {
-                'format': 'bestaudio/best',
-                'outtmpl': output_template,
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                "quiet": True,
-                "no_warnings": True
-            },
-            # Option 3: Download audio without conversion (no FFmpeg needed)
-            {
-                'format': 'bestaudio[ext=m4a]/bestaudio[ext=webm]/bestaudio',
-                'outtmpl': output_template,
-                "quiet": True,
-                "no_warnings": True
-            }
-        ]
-
-        # Try each option until one works
-        for i, ydl_opts in enumerate(ydl_opts_list):
-            try:
-                logger.info(f"Trying download option {i+1}...")
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([youtube_url])
-                
-                # Check what file was actually downloaded
-                if i < 2:  # Options 1 and 2 should create MP3
-                    audio_file_path = output_template.replace("%(ext)s", "mp3")
-                else:  # Option 3 creates original format
-                    # Find the actual downloaded file
-                    for ext in ['m4a', 'webm', 'mp3', 'mp4']:
-                        test_path = output_template.replace("%(ext)s", ext)
-                        if os.path.exists(test_path):
-                            audio_file_path = test_path
-                            break
-                    else:
-                        # If no file found, try to find any audio file in downloads
-                        for file in os.listdir(download_dir):
-                            if file.startswith(safe_title) and any(file.endswith(ext) for ext in ['.m4a', '.webm', '.mp3', '.mp4']):
-                                audio_file_path = os.path.join(download_dir, file)
-                                break
-                        else:
-                            raise FileNotFoundError("No audio file found after download")
-                
-                logger.info(f"Audio file saved as: {audio_file_path}")
-                logger.debug(f"Full audio path: {os.path.abspath(audio_file_path)}")
-                return audio_file_path
-                
-            except Exception as e:
-                logger.warning(f"Download option {i+1} failed: {str(e)}")
-                if i == len(ydl_opts_list) - 1:  # Last option
-                    raise
-                continue
+
+        # Step 2: Pick the format from the probed list instead of trying downloads until one works
+        selected_format, conversion = select_audio_format(
+            info_dict.get("formats") or [],
+            audio_splitter.FFMPEG_AVAILABLE,
+            profile
+        )
+        downloaded_ext = "mp3" if conversion == "mp3" else selected_format.get("ext", "m4a")
+        logger.info(f"Using sanitized filename: {safe_title}")
+
+        output_template = os.path.join(DOWNLOAD_DIR, f"{safe_title}.%(ext)s")
+        ydl_opts = {
+            'format': selected_format["format_id"],
+            'outtmpl': output_template,
+            "quiet": True,
+            "no_warnings": True
+        }
+        if conversion == "mp3":
+            ydl_opts['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }]
+
+        # Step 3: Download from the already resolved info instead of re-resolving the URL
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            ydl.process_ie_result(info_dict, download=True)
+
+        audio_file_path = output_template.replace("%(ext)s", downloaded_ext)
+        if not os.path.exists(audio_file_path):
+            raise FileNotFoundError(f"No audio file found after download: {audio_file_path}")
+
+        # Step 4: Re-encode for speech recognition and drop the original stream
+        if conversion == "speech":
+            speech_path = os.path.join(DOWNLOAD_DIR, f"{safe_title}{audio_splitter.SPEECH_ENCODING_EXT}")
+            logger.info("Encoding audio with the speech profile...")
+            audio_splitter.transcode_audio(audio_file_path, speech_path)
+            logger.debug(f"Speech encoding reduced {os.path.getsize(audio_file_path)} bytes to {os.path.getsize(speech_path)} bytes")
+            os.remove(audio_file_path)
+            audio_file_path = speech_path
+
+        _record_download(video_id, profile, audio_file_path, video_title)
+
+        logger.info(f"Audio file saved as: {audio_file_path}")
+        logger.debug(f"Full audio path: {os.path.abspath(audio_file_path)}")
+        return audio_file_path
 
     except yt_dlp.utils.DownloadError as e:
         logger.error(f"Failed to download video: {str(e)}")
@@ -105,4 +197,179 @@ def download_audio(youtube_url):
         logger.error(f"Unexpected error while downloading video: {str(e)}", exc_info=True)
         raise
 
-    return audio_file_path
\ No newline at end of file
+def fetch_captions(youtube_url, languages=None):
+    """Fetch YouTube captions for a video and return them as a cleaned transcript.
+
+    Manual subtitles are preferred over automatic captions. Returns a dict with
+    transcript, title, video_id, language and automatic, or None if the video
+    has no usable captions in the requested languages."""
+    languages = languages or CAPTION_LANGUAGES
+    logger.info("Looking for YouTube captions...")
+
+    try:
+        info_dict = probe_video(youtube_url)
+
+        track = None
+        for automatic, tracks in ((False, info_dict.get("subtitles")), (True, info_dict.get("automatic_captions"))):
+            language = _pick_caption_language(tracks or {}, languages, info_dict.get("language"))
+            if language:
+                track = _pick_caption_format(tracks[language])
+                if track:
+                    break
+
+        if not track:
+            logger.info("No usable captions found for this video")
+            return None
+
+        kind = "automatic" if automatic else "manual"
+        logger.info(f"Downloading {kind} captions ({language}, {track['ext']})")
+        with yt_dlp.YoutubeDL({"quiet": True, "no_warnings": True}) as ydl:
+            raw_captions = ydl.urlopen(track["url"]).read().decode("utf-8", errors="replace")
+
+        transcript = clean_captions(raw_captions)
+        if not transcript:
+            logger.warning("Captions were empty after cleaning")
+            return None
+
+        logger.info(f"Fetched caption transcript ({len(transcript)} characters)")
+        return {
+            "transcript": transcript,
+            "title": info_dict.get("title", "audio"),
+            "video_id": info_dict.get("id"),
+            "language": language,
+            "automatic": automatic
+        }
+
+    except yt_dlp.utils.DownloadError as e:
+        logger.error(f"Failed to fetch captions: {str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error while fetching captions: {str(e)}", exc_info=True)
+        raise
+
+def clean_captions(raw_captions):
+    """Turn a WebVTT or SRT caption file into plain transcript text.
+
+    Cue numbers, timings, styling tags and the lines automatic captions repeat
+    as they roll forward are removed."""
+    lines = []
+    for line in raw_captions.splitlines():
+        line = line.strip()
+        if not line or line == "WEBVTT" or line.isdigit():
+            continue
+        if line.startswith(("NOTE", "Kind:", "Language:", "STYLE", "REGION")) or "-->" in line:
+            continue
+
+        line = re.sub(r"<[^>]+>", "", line)  # Inline timestamps and styling tags
+        line = html.unescape(line).strip()
+        if not line or (line.startswith("[") and line.endswith("]")):  # e.g. [Music]
+            continue
+
+        # Automatic captions repeat the previous line at the start of each cue
+        if lines and line == lines[-1]:
+            continue
+        lines.append(line)
+
+    return " ".join(lines)
+
+def _pick_caption_language(tracks, languages, video_language):
+    """Pick the caption language to use from the available tracks, or None."""
+    if not tracks:
+        return None
+
+    candidates = list(languages)
+    if video_language and video_language not in candidates:
+        candidates.append(video_language)
+
+    for wanted in candidates:
+        # Automatic captions mark the untranslated original track with an -orig suffix
+        for language in (f"{wanted}-orig", wanted):
+            if language in tracks:
+                return language
+        for language in tracks:
+            if language.split("-")[0] == wanted:
+                return language
+    return None
+
+def _pick_caption_format(formats):
+    """Pick the first caption format we know how to clean."""
+    for ext in CAPTION_FORMATS:
+        for caption_format in formats:
+            if caption_format.get("ext") == ext and caption_format.get("url"):
+                return caption_format
+    return None
+
+def select_audio_format(formats, ffmpeg_available, profile="mp3"):
+    """Choose the format to download from a probed format list.
+
+    Returns (format, conversion) where conversion is "mp3", "speech" or None.
+    For the mp3 profile audio-only streams are preferred, MP3 first, then by
+    bitrate. The speech profile takes the smallest audio-only stream of at least
+    SPEECH_MIN_SOURCE_ABR kbps. Without ffmpeg only formats Whisper accepts as-is
+    are considered."""
+    audio_only = [
+        f for f in formats
+        if f.get("acodec") not in (None, "none") and f.get("vcodec") in (None, "none")
+    ]
+    with_audio = [f for f in formats if f.get("acodec") not in (None, "none")]
+
+    def bitrate(f):
+        return f.get("abr") or f.get("tbr") or 0
+
+    # Speech: the source only needs enough quality to survive re-encoding to low-bitrate mono
+    if profile == "speech" and audio_only and ffmpeg_available:
+        adequate = [f for f in audio_only if bitrate(f) >= SPEECH_MIN_SOURCE_ABR]
+        if adequate:
+            return min(adequate, key=bitrate), "speech"
+        return max(audio_only, key=bitrate), "speech"
+
+    # Option 1: an MP3 stream needs neither conversion nor ffmpeg
+    mp3_formats = [f for f in audio_only if f.get("ext") == "mp3"]
+    if mp3_formats:
+        return max(mp3_formats, key=bitrate), None
+
+    # Option 2: best audio-only stream, converted to MP3 when ffmpeg is available
+    if audio_only and ffmpeg_available:
+        return max(audio_only, key=bitrate), "mp3"
+
+    # Option 3: best audio-only stream in a container Whisper accepts (no FFmpeg needed)
+    supported = [f for f in audio_only if f.get("ext") in WHISPER_AUDIO_EXTS]
+    if supported:
+        return max(supported, key=bitrate), None
+
+    # Last resort: the smallest combined stream, with its audio track extracted when possible
+    smallest_first = lambda f: f.get("height") or 0
+    if with_audio and ffmpeg_available:
+        return min(with_audio, key=smallest_first), "speech" if profile == "speech" else "mp3"
+    supported = [f for f in with_audio if f.get("ext") in WHISPER_AUDIO_EXTS]
+    if supported:
+        return min(supported, key=smallest_first), None
+
+    raise yt_dlp.utils.DownloadError("No downloadable audio format found for this video")
+
+def get_cached_download(video_id, profile=None):
+    """Return the path of an earlier download of a video in the given profile if the file still exists, else None."""
+    profile = profile or AUDIO_PROFILE
+    if not video_id:
+        return None
+
+    with _index_lock:
+        index = utilities.load_json(DOWNLOAD_INDEX_PATH, {})
+    entry = index.get(video_id, {}).get(profile)
+
+    if entry and os.path.exists(entry["path"]):
+        logger.info(f"Using cached download for video {video_id}: {entry['path']}")
+        return entry["path"]
+
+    logger.debug(f"No cached {profile} download for video {video_id}")
+    return None
+
+def _record_download(video_id, profile, audio_file_path, video_title):
+    """Add a finished download to the download index."""
+    if not video_id:
+        return
+
+    with _index_lock:
+        index = utilities.load_json(DOWNLOAD_INDEX_PATH, {})
+        index.setdefault(video_id, {})[profile] = {"path": audio_file_path, "title": video_title}
+        utilities.save_json_atomic(DOWNLOAD_INDEX_PATH, index)
@@ -0,0 +1,213 @@
+"""
+Hedged requests for ProjectY.
+Starts a duplicate of a slow call once it has run longer than a percentile of
+recently observed latencies, uses whichever copy answers first and drops the
+other, so a single slow upstream reply no longer holds up the whole run. The
+hedge rate and the tail latency with and without hedging are kept per analysis
+for reporting.
+"""
+
+import math
+import time
+import threading
+import contextvars
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from projectY_modules import utilities
+from projectY_modules.config import (
+    HEDGE_PERCENTILE,
+    HEDGE_INITIAL_DELAY_SECONDS,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_MAX_WORKERS
+)
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# Latencies kept per kind of call for the hedge delay percentile
+LATENCY_WINDOW = 200
+
+def percentile(values, pct):
+    """Nearest-rank percentile of values, or None when there are none."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered), max(1, math.ceil(pct / 100 * len(ordered)))) - 1]
+
+class HedgeStats:
+    """Thread-safe record of hedged calls: how often a duplicate was sent and won,
+    the latency callers saw and the latency the first request alone took."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.observed = []
+        self.primary = []
+        self._primary_running = {}
+
+    def start_call(self, token, started):
+        with self._lock:
+            self.calls += 1
+            self._primary_running[token] = started
+
+    def primary_finished(self, token, seconds):
+        with self._lock:
+            # A call started before the last reset is not part of this run
+            if self._primary_running.pop(token, None) is not None:
+                self.primary.append(seconds)
+
+    def primary_cancelled(self, token, seconds):
+        # A first request cancelled before it started would have waited at least this long
+        self.primary_finished(token, seconds)
+
+    def finish_call(self, seconds, hedged, backup_won):
+        with self._lock:
+            self.observed.append(seconds)
+            self.hedged += hedged
+            self.backup_wins += backup_won
+
+    def summary(self):
+        with self._lock:
+            # First requests still running were dropped for a faster copy; their
+            # latency so far is a lower bound of what the caller would have waited
+            now = time.monotonic()
+            primary = self.primary + [now - started for started in self._primary_running.values()]
+            observed = list(self.observed)
+            p99_without = percentile(primary, 99)
+            p99_with = percentile(observed, 99)
+            return {
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "backup_wins": self.backup_wins,
+                "hedge_rate_percent": 100.0 * self.hedged / self.calls if self.calls else 0.0,
+                "p99_seconds": p99_with,
+                "p99_without_hedging_seconds": p99_without,
+                "primary_still_running": len(self._primary_running),
+                "p99_improvement_seconds": p99_without - p99_with if p99_with is not None and p99_without is not None else None
+            }
+
+# Counters for calls made outside an analysis started with start_run
+_stats = HedgeStats()
+
+# Counters of the analysis running in this context
+_run_stats = contextvars.ContextVar("projecty_hedge_stats", default=None)
+
+# Recent latencies per kind of call, shared by every analysis since they set the hedge delay
+_recent = {}
+_recent_lock = threading.Lock()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    # Shared and never waited on, so a dropped request does not hold up its caller
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_MAX_WORKERS, thread_name_prefix="hedge")
+        return _executor
+
+def _record_latency(kind, seconds):
+    with _recent_lock:
+        _recent.setdefault(kind, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+def hedge_delay(kind):
+    """Seconds to wait for a call of this kind before sending a duplicate: the
+    HEDGE_PERCENTILE of recent latencies, or HEDGE_INITIAL_DELAY_SECONDS until
+    HEDGE_MIN_SAMPLES calls have been timed."""
+    with _recent_lock:
+        recent = list(_recent.get(kind, ()))
+    if len(recent) < HEDGE_MIN_SAMPLES:
+        return HEDGE_INITIAL_DELAY_SECONDS
+    return percentile(recent, HEDGE_PERCENTILE)
+
+def hedged_call(kind, primary, backup):
+    """Call primary(), and if it has not answered within hedge_delay(kind), also backup().
+
+    Returns the first answer that does not raise; the other request is cancelled
+    if it has not started yet and otherwise left to finish with its reply
+    discarded. Raises the primary's error if both fail."""
+    executor = _get_executor()
+    stats = current_stats()
+    started = time.monotonic()
+    token = object()
+    stats.start_call(token, started)
+
+    def timed(func, is_primary):
+        def run():
+            call_started = time.monotonic()
+            try:
+                return func()
+            finally:
+                elapsed = time.monotonic() - call_started
+                _record_latency(kind, elapsed)
+                if is_primary:
+                    stats.primary_finished(token, time.monotonic() - started)
+        return run
+
+    primary_future = utilities.submit_in_context(executor, timed(primary, True))
+    futures = {primary_future: "primary"}
+    delay = hedge_delay(kind)
+    done, _ = wait([primary_future], timeout=delay)
+
+    if not done:
+        logger.info(f"{kind} call still running after {delay:.1f}s, sending a hedged request")
+        futures[utilities.submit_in_context(executor, timed(backup, False))] = "backup"
+
+    first_error = None
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            error = future.exception()
+            if error is not None:
+                logger.debug(f"Hedged {kind} {futures[future]} request failed: {str(error)}")
+                if future is primary_future or first_error is None:
+                    first_error = error
+                continue
+
+            for loser in pending:
+                if loser.cancel() and loser is primary_future:
+                    stats.primary_cancelled(token, time.monotonic() - started)
+            backup_won = futures[future] == "backup"
+            if backup_won:
+                logger.info(f"Hedged request answered {kind} call first")
+            stats.finish_call(time.monotonic() - started, len(futures) > 1, backup_won)
+            return future.result()
+
+    stats.finish_call(time.monotonic() - started, len(futures) > 1, False)
+    raise first_error
+
+def current_stats():
+    """Return the hedging counters of the analysis running in this context."""
+    return _run_stats.get() or _stats
+
+def start_run():
+    """Give the analysis running in this context hedging counters of its own and return them.
+    The latencies behind the hedge delay stay shared."""
+    stats = HedgeStats()
+    _run_stats.set(stats)
+    return stats
+
+def stats_summary():
+    """Return the hedging counters and p99 latencies of the analysis running in this context."""
+    return current_stats().summary()
+
+def format_stats(summary):
+    """Format hedging counters as a single line."""
+    if not summary["calls"]:
+        return "No hedged calls made"
+    line = (
+        f"{summary['hedged']} of {summary['calls']} calls hedged ({summary['hedge_rate_percent']:.0f}%), "
+        f"{summary['backup_wins']} answered by the hedged request"
+    )
+    if summary["p99_improvement_seconds"] is not None:
+        line += (
+            f"; p99 latency {summary['p99_seconds']:.1f}s vs {'at least ' if summary['primary_still_running'] else ''}"
+            f"{summary['p99_without_hedging_seconds']:.1f}s for the first request alone "
+            f"({summary['p99_improvement_seconds']:.1f}s saved)"
+        )
+    return line
@@ -1,46 +1,94 @@
 import openai
 import logging
 from projectY_modules import prompts
-from projectY_modules.config import OPENAI_API_KEY
+from projectY_modules import token_budget
+from projectY_modules import clients
+from projectY_modules import resilience
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
 
-def generate_narrative(video_title, intro_text, verified_results):
-    """Generates a podcast-style narrative summarizing the predictions, outcomes, and ratings."""
+NARRATIVE_MODEL = "gpt-4-turbo"
+
+# Expected narrative length: the intro and conclusion, plus 60-90 seconds of speech per prediction
+NARRATIVE_FRAME_TOKENS = 250
+NARRATIVE_TOKENS_PER_PREDICTION = 250
+
+def format_video_details(video):
+    """Describe a video's channel, upload date and length for the narrative prompt."""
+    if not video:
+        return "Unknown"
+    details = []
+    if video.get("channel"):
+        details.append(f"Channel: {video['channel']}")
+    if video.get("upload_date"):
+        details.append(f"Uploaded: {video['upload_date']}")
+    if video.get("duration"):
+        details.append(f"Length: {round(video['duration'] / 60)} minutes")
+    return ". ".join(details) or "Unknown"
+
+def generate_narrative(video_title, intro_text, verified_results, video=None):
+    """Generates a podcast-style narrative summarizing the predictions, outcomes, and ratings.
+
+    verified_results is the list of VerificationResults from prediction_verifier and
+    video the optional metadata from downloader.get_video_metadata."""
     logger.info(f"Generating narrative for video: {video_title}")
     logger.debug(f"Number of predictions to summarize: {len(verified_results)}")
 
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        client = clients.get_openai_client()
 
         # Format the prediction results into readable markdown-style bullets
         prediction_blocks = ""
-        for i, (prediction, details) in enumerate(verified_results.items(), start=1):
-            prediction_blocks += f"Prediction {i}: {prediction}\n"
-            prediction_blocks += f"    Actual Result: {details['actual']}\n"
-            prediction_blocks += f"    Rating: {details['rating']}\n\n"
+        for i, result in enumerate(verified_results, start=1):
+            prediction_blocks += f"Prediction {i}: {result.prediction}\n"
+            prediction_blocks += f"    Actual Result: {result.actual}\n"
+            prediction_blocks += f"    Rating: {result.rating}\n\n"
         
         logger.debug("Formatted prediction blocks for narrative")
+        video_details = format_video_details(video)
+
+        # Size the reply from the number of predictions instead of a fixed cap
+        max_tokens = token_budget.max_tokens_for(
+            NARRATIVE_MODEL,
+            NARRATIVE_FRAME_TOKENS + NARRATIVE_TOKENS_PER_PREDICTION * len(verified_results)
+        )
+        system_message = {"role": "system", "content": "You are a podcast script writer that transforms prediction analysis into engaging narratives."}
+
+        # A long intro file is trimmed rather than pushing the prompt past the context window
+        intro_text = token_budget.fit_text(
+            intro_text or "",
+            NARRATIVE_MODEL,
+            [system_message, {"role": "user", "content": prompts.generate_narrative_prompt.format(
+                video_title=video_title,
+                video_details=video_details,
+                intro_text="",
+                predictions_block=prediction_blocks.strip()
+            )}],
+            max_tokens,
+            label="intro text"
+        )
 
         # Build the narrative generation prompt
         prompt = prompts.generate_narrative_prompt.format(
             video_title=video_title,
-            intro_text=intro_text or "",
+            video_details=video_details,
+            intro_text=intro_text,
             predictions_block=prediction_blocks.strip()
         )
         logger.debug("Built narrative generation prompt")
+        messages = [system_message, {"role": "user", "content": prompt}]
+        prompt_tokens = token_budget.check_request(NARRATIVE_MODEL, messages, max_tokens)
 
         logger.info("Sending narrative generation prompt to GPT-4-Turbo...")
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[
-                {"role": "system", "content": "You are a podcast script writer that transforms prediction analysis into engaging narratives."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1000  # Can increase if needed
-        )
+        response = resilience.call("openai", lambda timeout: client.chat.completions.create(
+            model=NARRATIVE_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            timeout=clients.openai_timeout(timeout)
+        ))
         logger.debug("Received response from GPT-4-Turbo")
+        token_budget.record_usage(NARRATIVE_MODEL, response.usage, prompt_tokens, label="Narrative generation")
         
         narrative = response.choices[0].message.content.strip()
         logger.info("Successfully generated narrative")
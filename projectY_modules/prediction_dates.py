@@ -0,0 +1,175 @@
+"""
+Target dates of predictions for ProjectY.
+Finds the period a prediction is about ("in July 2030", "on 14 March 2027",
+"next year") with local patterns, using the video's upload date for relative
+phrases, so predictions about a period that has not started yet can be answered
+NOT YET without asking a verification model.
+"""
+
+import re
+import calendar
+import logging
+from datetime import date, timedelta
+from projectY_modules.results import VerificationResult
+from projectY_modules.config import DATE_RECHECK_GRACE_DAYS
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# Reported as the "model" that settled a prediction answered by the date check
+LOCAL_MODEL = "local date check"
+
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTHS["sept"] = 9
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10
+}
+
+_MONTH = r"(?P<month>" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?"
+_YEAR = r"(?P<year>(?:19|20|21)\d\d)"
+_DAY = r"(?P<day>[0-3]?\d)(?:st|nd|rd|th)?"
+_COUNT = r"(?P<count>\d+|" + "|".join(NUMBER_WORDS) + r")"
+
+# A deadline ("by 2030") can be met before it arrives, so it never proves NOT YET
+DEADLINE_PATTERN = re.compile(
+    r"\b(?:by|before|until|till|within|no later than|prior to)\s+(?:the\s+)?(?:end|start|beginning|middle)?\s*(?:of\s+)?"
+    r"(?:early\s+|mid\s+|late\s+)?(?:\d+|next|this|" + "|".join(MONTHS) + "|" + "|".join(NUMBER_WORDS) + r")\b",
+    re.IGNORECASE
+)
+
+# Patterns naming the period a prediction is about, from most to least specific
+DAY_PATTERNS = [
+    re.compile(r"\b" + _MONTH + r"\s+" + _DAY + r",?\s+" + _YEAR + r"\b", re.IGNORECASE),
+    re.compile(r"\b" + _DAY + r"\s+(?:of\s+)?" + _MONTH + r",?\s+" + _YEAR + r"\b", re.IGNORECASE),
+    re.compile(r"\b" + _YEAR + r"-(?P<month>[01]\d)-(?P<day>[0-3]\d)\b"),
+]
+MONTH_PATTERN = re.compile(r"\b(?:in|during)\s+(?:early\s+|mid\s+|late\s+)?" + _MONTH + r",?\s+" + _YEAR + r"\b", re.IGNORECASE)
+QUARTER_PATTERN = re.compile(
+    r"\b(?:in|during)\s+(?:the\s+)?(?:q(?P<q>[1-4])|(?P<ordinal>first|second|third|fourth)\s+quarter(?:\s+of)?)\s+" + _YEAR + r"\b",
+    re.IGNORECASE
+)
+YEAR_PATTERN = re.compile(r"\b(?:in|during)\s+(?:early\s+|mid\s+|late\s+)?" + _YEAR + r"\b", re.IGNORECASE)
+NEXT_PATTERN = re.compile(r"\bnext\s+(?P<unit>year|month)\b", re.IGNORECASE)
+IN_YEARS_PATTERN = re.compile(r"\bin\s+" + _COUNT + r"\s+years?\b", re.IGNORECASE)
+
+QUARTER_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+def _month_period(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+def _year_period(year):
+    return date(year, 1, 1), date(year, 12, 31)
+
+def find_target_periods(prediction, reference_date=None):
+    """Return the (start, end) date periods a prediction is about.
+
+    Explicit dates, months, quarters and years ("in 2030") are always resolved;
+    relative phrases ("next year", "in five years") only with a reference_date,
+    normally the video's upload date. A prediction with a deadline ("by 2030")
+    returns no periods, since it may already have come true."""
+    if DEADLINE_PATTERN.search(prediction):
+        return []
+
+    periods = []
+    taken = []
+
+    def claim(match):
+        # Each part of the text counts once, for its most specific pattern
+        span = match.span()
+        if any(span[0] < end and start < span[1] for start, end in taken):
+            return False
+        taken.append(span)
+        return True
+
+    for pattern in DAY_PATTERNS:
+        for match in pattern.finditer(prediction):
+            try:
+                month = match.group("month")
+                month = int(month) if month.isdigit() else MONTHS[month.lower().rstrip(".")]
+                day = date(int(match.group("year")), month, int(match.group("day")))
+            except (ValueError, KeyError):
+                continue
+            if claim(match):
+                periods.append((day, day))
+
+    for match in MONTH_PATTERN.finditer(prediction):
+        if claim(match):
+            periods.append(_month_period(int(match.group("year")), MONTHS[match.group("month").lower().rstrip(".")]))
+
+    for match in QUARTER_PATTERN.finditer(prediction):
+        if claim(match):
+            quarter = int(match.group("q")) if match.group("q") else QUARTER_ORDINALS[match.group("ordinal").lower()]
+            year = int(match.group("year"))
+            start = date(year, 3 * quarter - 2, 1)
+            periods.append((start, _month_period(year, 3 * quarter)[1]))
+
+    for match in YEAR_PATTERN.finditer(prediction):
+        if claim(match):
+            periods.append(_year_period(int(match.group("year"))))
+
+    if reference_date:
+        for match in NEXT_PATTERN.finditer(prediction):
+            if not claim(match):
+                continue
+            if match.group("unit").lower() == "year":
+                periods.append(_year_period(reference_date.year + 1))
+            else:
+                month_index = reference_date.year * 12 + reference_date.month  # the month after reference_date, 0-based
+                periods.append(_month_period(month_index // 12, month_index % 12 + 1))
+
+        for match in IN_YEARS_PATTERN.finditer(prediction):
+            if claim(match):
+                count = match.group("count").lower()
+                count = int(count) if count.isdigit() else NUMBER_WORDS[count]
+                periods.append(_year_period(reference_date.year + count))
+
+    return periods
+
+def anchor_relative(prediction, reference_date=None):
+    """Add when a prediction was made to its text if it uses a relative phrase.
+
+    "X will happen next year" means a different year in a 2020 video than in a 2025
+    one, so the verification cache, deduplication and the verification model all
+    work on "X will happen next year (predicted in 2020)" instead. Predictions
+    without a relative phrase, or without a reference_date, are returned unchanged."""
+    if not reference_date:
+        return prediction
+    next_units = {match.group("unit").lower() for match in NEXT_PATTERN.finditer(prediction)}
+    if not next_units and not IN_YEARS_PATTERN.search(prediction):
+        return prediction
+    stamp = reference_date.strftime("%B %Y") if "month" in next_units else str(reference_date.year)
+    return f"{prediction.rstrip().rstrip('.')} (predicted in {stamp})"
+
+def parse_upload_date(value):
+    """Parse a yt-dlp upload_date ("YYYYMMDD") or ISO date ("YYYY-MM-DD") into a date, or None."""
+    if not value:
+        return None
+    try:
+        value = str(value).replace("-", "")
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    except ValueError:
+        return None
+
+def not_yet_result(prediction, reference_date=None, today=None):
+    """Answer a prediction NOT YET locally if every period it is about starts after today.
+
+    Returns a VerificationResult with recheck_at set to DATE_RECHECK_GRACE_DAYS
+    after the last period ends, or None if the prediction needs a real check."""
+    today = today or date.today()
+    periods = find_target_periods(prediction, reference_date)
+    if not periods or min(start for start, _ in periods) <= today:
+        return None
+
+    start = min(start for start, _ in periods)
+    recheck_at = max(end for _, end in periods) + timedelta(days=DATE_RECHECK_GRACE_DAYS)
+    logger.info(f"Target date {start.isoformat()} has not arrived, answering NOT YET locally: {prediction}")
+    return VerificationResult(
+        prediction=prediction,
+        actual=f"The predicted period starts on {start.isoformat()}, which has not arrived yet. To be re-checked on {recheck_at.isoformat()}.",
+        rating="NOT YET",
+        model=LOCAL_MODEL,
+        recheck_at=recheck_at.isoformat()
+    )
@@ -0,0 +1,113 @@
+"""
+Prediction deduplication for ProjectY.
+Clusters near-identical predictions with a local similarity measure so each
+distinct claim is verified once, and the verdict is shared by every phrasing.
+"""
+
+import re
+import logging
+from projectY_modules.config import DEDUPE_THRESHOLD
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# Words that carry no meaning for telling two predictions apart
+STOPWORDS = {
+    "a", "an", "the", "will", "would", "be", "is", "are", "to", "of", "in", "on", "at", "by", "for",
+    "and", "that", "this", "it", "its", "i", "we", "they", "he", "she", "think", "going", "gonna",
+    "expect", "expects", "predict", "predicts", "likely", "probably", "definitely"
+}
+
+# Predictions that differ in one of these words say opposite things
+NEGATIONS = {"not", "no", "never", "wont", "cant", "cannot", "fail", "fails", "lose", "loses"}
+
+# Words that turn a prediction into its opposite when swapped for each other
+ANTONYM_PAIRS = [
+    ("double", "halve"), ("rise", "fall"), ("up", "down"), ("higher", "lower"), ("above", "below"),
+    ("increase", "decrease"), ("gain", "loss"), ("win", "lose"), ("bull", "bear"), ("more", "less"),
+    ("over", "under"), ("grow", "shrink"), ("boom", "bust"), ("buy", "sell"), ("hike", "cut"),
+    ("strengthen", "weaken"), ("beat", "miss"), ("first", "last"), ("before", "after"), ("early", "late")
+]
+ANTONYMS = {word for pair in ANTONYM_PAIRS for word in pair}
+
+def normalize(prediction):
+    """Lowercase a prediction and strip punctuation so trivially different copies compare equal."""
+    text = re.sub(r"[^\w\s%$.]", "", prediction.lower().strip().rstrip("."))
+    return " ".join(text.split())
+
+def _stem(word):
+    # Just enough to match "rate"/"rates" and "fall"/"falls"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def _content_words(text):
+    return {_stem(word) for word in text.split() if word not in STOPWORDS}
+
+def _numbers(text):
+    return set(re.findall(r"\d+(?:\.\d+)?", text))
+
+def _entities(prediction):
+    """Content words written with a capital letter: names of people, companies, teams and places."""
+    words = re.sub(r"[^\w\s]", " ", prediction).split()
+    return {
+        _stem(word.lower()) for word in words
+        if any(char.isupper() for char in word) and word.lower() not in STOPWORDS
+    }
+
+def similarity(a, b):
+    """Score how alike two predictions are, from 0.0 to 1.0.
+
+    The score is the Jaccard index of the content words of the normalized texts,
+    so only predictions that say the same thing in other filler words come close
+    to 1.0. Character-level likeness is deliberately ignored: "Nvidia will double"
+    and "Nvidia will halve" read almost the same. Predictions are never similar
+    when the words they do not share include a number, a negation, one side of an
+    antonym pair or a name: "20 goals" and "30 goals", "the US" and "the UK" or
+    "the Lakers" and "the Celtics" are different claims however alike the wording."""
+    normalized_a, normalized_b = normalize(a), normalize(b)
+    if normalized_a == normalized_b:
+        return 1.0
+    if _numbers(normalized_a) != _numbers(normalized_b):
+        return 0.0
+
+    words_a, words_b = _content_words(normalized_a), _content_words(normalized_b)
+    differing = words_a ^ words_b
+    if not differing:
+        return 1.0
+    if differing & (NEGATIONS | ANTONYMS | _entities(a) | _entities(b)):
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+def cluster_predictions(predictions, threshold=DEDUPE_THRESHOLD):
+    """Group near-identical predictions.
+
+    A prediction joins the first cluster whose every member scores at least
+    threshold against it, so clusters never chain through a middle prediction
+    that is a little like two different ones. Returns lists of indices into
+    predictions, each in original order and the clusters ordered by their first
+    member."""
+    clusters = []
+    for i, prediction in enumerate(predictions):
+        for members in clusters:
+            if all(similarity(predictions[j], prediction) >= threshold for j in members):
+                members.append(i)
+                break
+        else:
+            clusters.append([i])
+    return clusters
+
+def dedupe_predictions(predictions, threshold=DEDUPE_THRESHOLD):
+    """Pick one representative per cluster of near-identical predictions.
+
+    Returns (representatives, clusters): the first prediction of each cluster and
+    the member indices of each cluster, in the same order."""
+    clusters = cluster_predictions(predictions, threshold)
+    representatives = [predictions[members[0]] for members in clusters]
+
+    if len(representatives) < len(predictions):
+        logger.info(f"Deduplicated {len(predictions)} predictions into {len(representatives)} distinct claims")
+        for members in clusters:
+            if len(members) > 1:
+                logger.debug(f"Duplicates of '{predictions[members[0]]}': {[predictions[i] for i in members[1:]]}")
+    return representatives, clusters
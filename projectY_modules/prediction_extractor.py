@@ -1,39 +1,62 @@
 import openai
-import re
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from projectY_modules import prompts
-from projectY_modules.config import OPENAI_API_KEY
+from projectY_modules import clients
+from projectY_modules import resilience
+from projectY_modules import results
+from projectY_modules import prediction_prefilter
+from projectY_modules import prediction_dedupe
+from projectY_modules import token_budget
+from projectY_modules import utilities
+from projectY_modules.config import (
+    PREFILTER_ENABLED,
+    EXTRACTION_MODE,
+    EXTRACTION_WINDOW_TOKENS,
+    EXTRACTION_WINDOW_OVERLAP_TOKENS,
+    EXTRACTION_MAX_WORKERS
+)
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
 
-def extract_predictions(transcript, intro=""):
-    """Sends the transcription to GPT-4-Turbo and extracts predictions as a Python list."""
+# Maximum number of predictions returned per transcript
+MAX_PREDICTIONS = 10
+
+# Structured outputs need gpt-4o; gpt-4-turbo only offers unconstrained JSON mode
+EXTRACTION_MODEL = "gpt-4o"
+SYSTEM_MESSAGE = "You are an AI assistant that analyzes transcripts."
+
+# Typical length of one numbered prediction in the model's reply
+TOKENS_PER_PREDICTION = 40
+
+def extract_predictions(transcript, intro="", mode=None, prefilter=None):
+    """Sends the transcription to GPT-4o and extracts predictions as a Python list.
+
+    mode "single" sends the whole transcript in one prompt. "windowed" extracts from
+    overlapping windows in parallel and merges the results. "auto" (the default)
+    windows transcripts longer than one window. With prefilter, only passages with
+    prediction cues are sent to the model."""
+    mode = mode or EXTRACTION_MODE
+    prefilter = PREFILTER_ENABLED if prefilter is None else prefilter
     logger.info("Analyzing transcript for predictions...")
     logger.debug(f"Transcript length: {len(transcript)} characters")
     if intro:
         logger.debug(f"Using intro text of length: {len(intro)} characters")
 
+    if prefilter:
+        transcript, _ = prediction_prefilter.prefilter_transcript(transcript)
+        if not transcript:
+            logger.warning("Pre-filter found no passages with prediction cues")
+            return []
+
     try:
-        # Send the request to OpenAI's GPT-4-Turbo
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        prompt = prompts.extract_predictions_prompt.format(intro=intro, transcript=transcript)
-        
-        logger.debug("Sending request to GPT-4-Turbo...")
-        response = client.chat.completions.create(
-            model="gpt-4-turbo",
-            messages=[{"role": "system", "content": "You are an AI assistant that analyzes transcripts."},
-                      {"role": "user", "content": prompt}],
-            max_tokens=400
-        )
-        logger.debug("Received response from GPT-4-Turbo")
-
-        predictions_text = response.choices[0].message.content.strip()
-        logger.debug(f"Raw predictions text: {predictions_text}")
-
-        # Extract predictions using regex to capture numbered list format
-        predictions_list = re.findall(r"\d+\.\s*(.*)", predictions_text)
-        logger.debug(f"Found {len(predictions_list)} predictions")
+        client = clients.get_openai_client()
+
+        if mode == "windowed" or (mode == "auto" and token_budget.count_tokens(transcript, EXTRACTION_MODEL) > EXTRACTION_WINDOW_TOKENS):
+            predictions_list = _extract_windowed(client, transcript, intro)
+        else:
+            predictions_list = _extract_from_text(client, transcript, intro)
 
         if not predictions_list:
             logger.warning("No clear predictions found in the transcript")
@@ -47,4 +70,147 @@ def extract_predictions(transcript, intro=""):
         raise
     except Exception as e:
         logger.error(f"Unexpected error during prediction extraction: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+def split_into_windows(transcript, window_tokens=EXTRACTION_WINDOW_TOKENS, overlap_tokens=EXTRACTION_WINDOW_OVERLAP_TOKENS):
+    """Split a transcript on word boundaries into overlapping windows of about window_tokens each."""
+    words = transcript.split()
+    windows = []
+    start = 0
+
+    while start < len(words):
+        end = start
+        tokens = 0
+        while end < len(words) and (tokens < window_tokens or end == start):
+            tokens += token_budget.count_tokens(words[end] + " ", EXTRACTION_MODEL)
+            end += 1
+        windows.append(" ".join(words[start:end]))
+
+        if end >= len(words):
+            break
+
+        # Step back so the next window repeats the last overlap_tokens of this one
+        next_start = end
+        overlap = 0
+        while next_start > start + 1 and overlap < overlap_tokens:
+            next_start -= 1
+            overlap += token_budget.count_tokens(words[next_start] + " ", EXTRACTION_MODEL)
+        start = next_start
+
+    return windows
+
+def _extract_from_text(client, text, intro):
+    """Run the extraction prompt on one piece of transcript and return the numbered predictions."""
+    max_tokens = token_budget.max_tokens_for(EXTRACTION_MODEL, MAX_PREDICTIONS * TOKENS_PER_PREDICTION)
+
+    # Trim the transcript so the prompt fits the context window instead of failing after the round-trip
+    text = token_budget.fit_text(
+        text,
+        EXTRACTION_MODEL,
+        _build_messages(prompts.extract_predictions_prompt.format(intro=intro, transcript="")),
+        max_tokens,
+        label="transcript"
+    )
+    messages = _build_messages(prompts.extract_predictions_prompt.format(intro=intro, transcript=text))
+    prompt_tokens = token_budget.check_request(EXTRACTION_MODEL, messages, max_tokens)
+
+    logger.debug("Sending request to GPT-4o...")
+    response = resilience.call("openai", lambda timeout: client.chat.completions.create(
+        model=EXTRACTION_MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        response_format=results.openai_response_format("predictions", results.PREDICTIONS_SCHEMA),
+        timeout=clients.openai_timeout(timeout)
+    ))
+    logger.debug("Received response from GPT-4o")
+    token_budget.record_usage(EXTRACTION_MODEL, response.usage, prompt_tokens, label="Prediction extraction")
+
+    predictions_text = response.choices[0].message.content.strip()
+    logger.debug(f"Raw predictions text: {predictions_text}")
+
+    predictions_list = results.parse_predictions(predictions_text)
+    logger.debug(f"Found {len(predictions_list)} predictions")
+    return predictions_list
+
+def _extract_windowed(client, transcript, intro):
+    """Map the extraction prompt over transcript windows in parallel, then merge and rank the results."""
+    windows = split_into_windows(transcript)
+    workers = max(1, min(EXTRACTION_MAX_WORKERS, len(windows)))
+    logger.info(f"Extracting predictions from {len(windows)} transcript windows with up to {workers} concurrent requests")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [utilities.submit_in_context(executor, _extract_from_text, client, window, intro) for window in windows]
+
+        window_results = []
+        for i, future in enumerate(futures, 1):
+            try:
+                window_results.append(future.result())
+            except Exception as e:
+                logger.warning(f"Extraction failed for window {i}/{len(windows)}: {str(e)}")
+
+    if not window_results:
+        raise RuntimeError("Prediction extraction failed for every transcript window")
+
+    candidates = merge_predictions(window_results)
+    logger.info(f"Merged {sum(len(r) for r in window_results)} window predictions into {len(candidates)} candidates")
+
+    if len(candidates) <= MAX_PREDICTIONS:
+        return candidates
+    return _rank_predictions(client, candidates, intro)
+
+def merge_predictions(window_results):
+    """Merge per-window prediction lists, collapsing near-duplicates from overlapping windows.
+
+    Candidates are ordered by how many window predictions they absorbed, then by first appearance."""
+    flattened = [
+        prediction.strip()
+        for predictions in window_results
+        for prediction in predictions
+        if prediction_dedupe.normalize(prediction)
+    ]
+    representatives, clusters = prediction_dedupe.dedupe_predictions(flattened)
+
+    order = sorted(range(len(representatives)), key=lambda i: -len(clusters[i]))
+    return [representatives[i] for i in order]
+
+def _rank_predictions(client, candidates, intro):
+    """Ask the model to consolidate the merged candidates and keep the top MAX_PREDICTIONS."""
+    max_tokens = token_budget.max_tokens_for(EXTRACTION_MODEL, MAX_PREDICTIONS * TOKENS_PER_PREDICTION)
+    candidate_lines = token_budget.fit_text(
+        "\n".join(f"- {candidate}" for candidate in candidates),
+        EXTRACTION_MODEL,
+        _build_messages(prompts.rank_predictions_prompt.format(intro=intro, candidates="", max_predictions=MAX_PREDICTIONS)),
+        max_tokens,
+        label="candidate predictions"
+    )
+    messages = _build_messages(prompts.rank_predictions_prompt.format(
+        intro=intro,
+        candidates=candidate_lines,
+        max_predictions=MAX_PREDICTIONS
+    ))
+    prompt_tokens = token_budget.check_request(EXTRACTION_MODEL, messages, max_tokens)
+
+    logger.debug(f"Ranking {len(candidates)} candidate predictions with GPT-4o...")
+    response = resilience.call("openai", lambda timeout: client.chat.completions.create(
+        model=EXTRACTION_MODEL,
+        messages=messages,
+        max_tokens=max_tokens,
+        response_format=results.openai_response_format("predictions", results.PREDICTIONS_SCHEMA),
+        timeout=clients.openai_timeout(timeout)
+    ))
+    token_budget.record_usage(EXTRACTION_MODEL, response.usage, prompt_tokens, label="Prediction ranking")
+
+    try:
+        ranked = results.parse_predictions(response.choices[0].message.content)
+    except results.MalformedReplyError as e:
+        logger.warning(f"Could not parse the ranking reply ({str(e)}), keeping the most frequent candidates")
+        return candidates[:MAX_PREDICTIONS]
+    if not ranked:
+        logger.warning("Ranking reply had no predictions, keeping the most frequent candidates")
+        return candidates[:MAX_PREDICTIONS]
+    return ranked[:MAX_PREDICTIONS]
+
+def _build_messages(prompt):
+    """Wrap an extraction prompt in the chat messages sent to the model."""
+    return [{"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}]
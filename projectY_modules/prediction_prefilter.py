@@ -0,0 +1,103 @@
+"""
+Local prediction pre-filter for ProjectY.
+Scores transcript sentences for forward-looking cues and keeps only the
+high-scoring passages plus surrounding context, so far fewer tokens are sent
+to the extraction model.
+"""
+
+import re
+import logging
+from projectY_modules.config import PREFILTER_THRESHOLD, PREFILTER_CONTEXT_SENTENCES
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# (pattern, weight) pairs; a sentence's score is the sum of the weights of the cues it contains
+PREDICTION_CUES = [
+    # Future tense and intent
+    (r"\bwill\b|\bwon'?t\b|\w'll\b|\bgoing to\b|\bgonna\b|\bshall\b", 2.0),
+    # Expectation and forecasting language
+    (r"\b(expect|expects|expected|expecting|predict|predicts|predicted|prediction|forecast|forecasts|"
+     r"anticipate|anticipates|project|projected|bet|betting|odds|likely|unlikely|probably|"
+     r"guarantee|guaranteed|bound to|on track to|set to|poised to|about to)\b", 1.5),
+    # Speaker committing to an opinion
+    (r"\bi (think|believe|reckon|suspect|bet)\b|\bmy (view|call|guess|money)\b|\bin my opinion\b|"
+     r"\bmark my words\b|\bi'?m (confident|convinced|sure)\b|\bi am (confident|convinced|sure)\b", 1.0),
+    # Outcome verbs that predictions are usually about
+    (r"\b(win|wins|lose|loses|beat|beats|reach|reaches|hit|hits|rise|rises|fall|falls|drop|drops|"
+     r"crash|crashes|double|doubles|increase|increases|decrease|decreases|grow|grows|shrink|shrinks|"
+     r"surpass|overtake|collapse|recover|recession|elected|champion)\b", 1.0),
+    # Time horizons
+    (r"\b(next|this|coming) (year|month|week|season|quarter|decade|election|summer|winter|spring|fall)\b|"
+     r"\bby (the end of|20\d\d|next)\b|\bwithin (a|the next|\d+)\b|\bsoon\b|\beventually\b", 1.0),
+    # Explicit dates
+    (r"\b20\d\d\b|\b(january|february|march|april|may|june|july|august|september|october|november|december)\b|"
+     r"\bq[1-4]\b", 1.0),
+    # Numbers, percentages and money
+    (r"\d+(\.\d+)?\s*(%|percent|k\b|million|billion|trillion)|[$€£]\s*\d", 0.5),
+]
+
+_COMPILED_CUES = [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in PREDICTION_CUES]
+
+# Unpunctuated transcripts (e.g. automatic captions) are cut into pseudo-sentences of this many words
+FALLBACK_SENTENCE_WORDS = 30
+
+def split_sentences(text):
+    """Split transcript text into sentences, falling back to fixed word runs when it has no punctuation."""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", text) if s.strip()]
+
+    # One giant "sentence" means the transcript has no usable punctuation
+    if len(sentences) <= 1 or max(len(s.split()) for s in sentences) > FALLBACK_SENTENCE_WORDS * 4:
+        words = text.split()
+        sentences = [
+            " ".join(words[i:i + FALLBACK_SENTENCE_WORDS])
+            for i in range(0, len(words), FALLBACK_SENTENCE_WORDS)
+        ]
+    return sentences
+
+def score_sentence(sentence):
+    """Score a sentence by the prediction cues it contains."""
+    return sum(weight for pattern, weight in _COMPILED_CUES if pattern.search(sentence))
+
+def prefilter_transcript(transcript, threshold=PREFILTER_THRESHOLD, context=PREFILTER_CONTEXT_SENTENCES):
+    """Keep only the passages of a transcript likely to contain predictions.
+
+    Sentences scoring at least threshold are kept together with context sentences
+    on either side; adjacent kept sentences are joined into passages separated by
+    "...". Returns (reduced_text, stats)."""
+    sentences = split_sentences(transcript)
+    keep = [False] * len(sentences)
+
+    hits = 0
+    for i, sentence in enumerate(sentences):
+        if score_sentence(sentence) >= threshold:
+            hits += 1
+            for j in range(max(0, i - context), min(len(sentences), i + context + 1)):
+                keep[j] = True
+
+    passages = []
+    current = []
+    for sentence, kept in zip(sentences, keep):
+        if kept:
+            current.append(sentence)
+        elif current:
+            passages.append(" ".join(current))
+            current = []
+    if current:
+        passages.append(" ".join(current))
+
+    reduced_text = "\n...\n".join(passages)
+
+    stats = {
+        "sentences": len(sentences),
+        "candidate_sentences": hits,
+        "kept_sentences": sum(keep),
+        "original_chars": len(transcript),
+        "kept_chars": len(reduced_text),
+        "reduction_percent": 100 * (1 - len(reduced_text) / len(transcript)) if transcript else 0.0
+    }
+    logger.info(
+        f"Pre-filter kept {stats['kept_sentences']}/{stats['sentences']} sentences "
+        f"({stats['reduction_percent']:.1f}% smaller)"
+    )
+    return reduced_text, stats
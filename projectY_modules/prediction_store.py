@@ -0,0 +1,385 @@
+"""
+Prediction store for ProjectY.
+Keeps every analyzed video with its transcript, predictions, verdicts, narrative
+and stage timings in SQLite, shared by the CLI and the Streamlit app. Predictions
+have a full-text index so they can be searched across videos, and open ones
+(NOT YET and UNCLEAR) carry a re-check date so a scheduled run can re-verify just
+the ones that are due instead of re-running the pipeline for each video.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import date, timedelta
+from projectY_modules.results import VerificationResult
+from projectY_modules.config import CACHE_DIR, RECHECK_INTERVAL_DAYS
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+STORE_PATH = os.path.join(CACHE_DIR, "projecty.sqlite3")
+
+# Ratings that can still change and are re-checked
+OPEN_RATINGS = {"NOT YET", "UNCLEAR"}
+
+# Serializes writes between threads of the same process (e.g. Streamlit sessions)
+_db_lock = threading.Lock()
+
+# The schema is created once per process rather than on every connection
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+# Check whether this SQLite build has FTS5; searches fall back to LIKE without it
+try:
+    sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE fts5_probe USING fts5(text)")
+    FTS5_AVAILABLE = True
+except sqlite3.OperationalError:
+    FTS5_AVAILABLE = False
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS videos (
+        key TEXT PRIMARY KEY,
+        video_id TEXT,
+        title TEXT,
+        channel TEXT,
+        upload_date TEXT,
+        duration REAL,
+        url TEXT,
+        intro_text TEXT,
+        narrative TEXT,
+        analyzed_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS predictions (
+        id INTEGER PRIMARY KEY,
+        video_key TEXT NOT NULL REFERENCES videos(key),
+        position INTEGER NOT NULL,
+        prediction TEXT NOT NULL,
+        actual TEXT NOT NULL,
+        rating TEXT NOT NULL,
+        confidence TEXT,
+        model TEXT,
+        error TEXT,
+        verified_at REAL NOT NULL,
+        recheck_at TEXT,
+        UNIQUE (video_key, position)
+    );
+    CREATE INDEX IF NOT EXISTS predictions_due ON predictions (recheck_at) WHERE recheck_at IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS predictions_rating ON predictions (rating);
+    CREATE INDEX IF NOT EXISTS predictions_video_rating ON predictions (video_key, rating);
+    CREATE INDEX IF NOT EXISTS videos_channel ON videos (channel COLLATE NOCASE);
+    CREATE INDEX IF NOT EXISTS videos_upload_date ON videos (upload_date);
+    CREATE TABLE IF NOT EXISTS transcripts (
+        video_key TEXT PRIMARY KEY REFERENCES videos(key),
+        transcript TEXT NOT NULL,
+        prefiltered INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS timings (
+        video_key TEXT NOT NULL REFERENCES videos(key),
+        stage TEXT NOT NULL,
+        seconds REAL NOT NULL,
+        PRIMARY KEY (video_key, stage)
+    );
+"""
+
+# External-content FTS5 index over prediction texts, kept in sync by triggers
+FTS_SCHEMA = """
+    CREATE VIRTUAL TABLE predictions_fts USING fts5(
+        prediction, content='predictions', content_rowid='id', tokenize='porter unicode61'
+    );
+    CREATE TRIGGER predictions_fts_insert AFTER INSERT ON predictions BEGIN
+        INSERT INTO predictions_fts (rowid, prediction) VALUES (new.id, new.prediction);
+    END;
+    CREATE TRIGGER predictions_fts_delete AFTER DELETE ON predictions BEGIN
+        INSERT INTO predictions_fts (predictions_fts, rowid, prediction) VALUES ('delete', old.id, old.prediction);
+    END;
+    CREATE TRIGGER predictions_fts_update AFTER UPDATE OF prediction ON predictions BEGIN
+        INSERT INTO predictions_fts (predictions_fts, rowid, prediction) VALUES ('delete', old.id, old.prediction);
+        INSERT INTO predictions_fts (rowid, prediction) VALUES (new.id, new.prediction);
+    END;
+    INSERT INTO predictions_fts (predictions_fts) VALUES ('rebuild');
+"""
+
+def _connect():
+    global _schema_ready
+    os.makedirs(os.path.dirname(STORE_PATH) or ".", exist_ok=True)
+    connection = sqlite3.connect(STORE_PATH, timeout=30)
+    connection.row_factory = sqlite3.Row
+    if not _schema_ready:
+        # WAL lets the Streamlit app read while a scheduled re-check writes
+        connection.execute("PRAGMA journal_mode=WAL")
+        with _schema_lock:
+            connection.executescript(SCHEMA)
+            transcript_columns = {row["name"] for row in connection.execute("PRAGMA table_info(transcripts)")}
+            if "prefiltered" not in transcript_columns:
+                # Left NULL (unknown) for transcripts stored before the column existed
+                connection.execute("ALTER TABLE transcripts ADD COLUMN prefiltered INTEGER")
+            has_fts = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'predictions_fts'"
+            ).fetchone()
+            if FTS5_AVAILABLE and not has_fts:
+                # Also indexes predictions stored before the index existed
+                logger.info("Building the prediction full-text index")
+                connection.executescript(FTS_SCHEMA)
+        _schema_ready = True
+    return connection
+
+def video_key(video_id=None, transcript=None):
+    """Key a video by its YouTube ID, or an uploaded transcript by the hash of its text."""
+    if video_id:
+        return video_id
+    return "transcript:" + hashlib.sha256((transcript or "").encode("utf-8")).hexdigest()[:16]
+
+def recheck_date(result, today=None):
+    """The ISO date an open verdict is due for a re-check, or None for a settled one.
+
+    A date from the local date check is kept; other open verdicts are due
+    RECHECK_INTERVAL_DAYS from today."""
+    if result.rating not in OPEN_RATINGS and not result.error:
+        return None
+    if result.recheck_at:
+        return result.recheck_at
+    return ((today or date.today()) + timedelta(days=RECHECK_INTERVAL_DAYS)).isoformat()
+
+def save_analysis(key, title, verification_results, narrative=None, video=None, intro_text="", transcript=None, timings=None, prefiltered=None):
+    """Store a video's analysis, replacing any earlier analysis of the same video.
+
+    timings maps pipeline stages (e.g. "transcription") to the seconds they took and
+    prefiltered records whether predictions were extracted from a pre-filtered transcript."""
+    video = video or {}
+    now = time.time()
+    rows = [
+        (key, position, result.prediction, result.actual, result.rating, result.confidence,
+         result.model, result.error, now, recheck_date(result))
+        for position, result in enumerate(verification_results)
+    ]
+
+    with _db_lock:
+        connection = _connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO videos (key, video_id, title, channel, upload_date, duration, url, intro_text, narrative, analyzed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, video.get("video_id"), title, video.get("channel"), video.get("upload_date"),
+                     video.get("duration"), video.get("url"), intro_text, narrative, now)
+                )
+                connection.execute("DELETE FROM predictions WHERE video_key = ?", (key,))
+                connection.executemany(
+                    "INSERT INTO predictions (video_key, position, prediction, actual, rating, confidence, model, error, verified_at, recheck_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                if transcript is not None:
+                    connection.execute(
+                        "INSERT OR REPLACE INTO transcripts (video_key, transcript, prefiltered) VALUES (?, ?, ?)",
+                        (key, transcript, None if prefiltered is None else int(prefiltered))
+                    )
+                connection.execute("DELETE FROM timings WHERE video_key = ?", (key,))
+                connection.executemany(
+                    "INSERT INTO timings (video_key, stage, seconds) VALUES (?, ?, ?)",
+                    [(key, stage, seconds) for stage, seconds in (timings or {}).items()]
+                )
+        finally:
+            connection.close()
+
+    open_count = sum(1 for row in rows if row[-1])
+    logger.info(f"Stored {len(rows)} predictions for '{title}' ({open_count} open)")
+
+def due_predictions(today=None, limit=None):
+    """Return the open predictions due for a re-check by today, earliest first.
+
+    Each item is a dict with id, video_key, prediction, rating, recheck_at and the
+    video's upload_date, which relative phrases such as "next year" refer to."""
+    today = (today or date.today()).isoformat()
+    query = (
+        "SELECT p.id, p.video_key, p.prediction, p.rating, p.recheck_at, v.upload_date "
+        "FROM predictions p JOIN videos v ON v.key = p.video_key "
+        "WHERE p.recheck_at IS NOT NULL AND p.recheck_at <= ? ORDER BY p.recheck_at, p.id"
+    )
+    params = (today,)
+    if limit:
+        query += " LIMIT ?"
+        params += (limit,)
+
+    connection = _connect()
+    try:
+        return [dict(row) for row in connection.execute(query, params)]
+    finally:
+        connection.close()
+
+def update_verdicts(due, verification_results):
+    """Store fresh verdicts for predictions from due_predictions, in the same order.
+
+    A failed re-check keeps the stored verdict and is only moved to the next
+    re-check date. Returns the keys of the videos where a rating changed."""
+    now = time.time()
+    changed = set()
+    with _db_lock:
+        connection = _connect()
+        try:
+            with connection:
+                for item, result in zip(due, verification_results):
+                    if result.error:
+                        connection.execute(
+                            "UPDATE predictions SET recheck_at = ? WHERE id = ?",
+                            ((date.today() + timedelta(days=RECHECK_INTERVAL_DAYS)).isoformat(), item["id"])
+                        )
+                        continue
+                    connection.execute(
+                        "UPDATE predictions SET actual = ?, rating = ?, confidence = ?, model = ?, error = ?, verified_at = ?, recheck_at = ? "
+                        "WHERE id = ?",
+                        (result.actual, result.rating, result.confidence, result.model, result.error, now,
+                         recheck_date(result), item["id"])
+                    )
+                    if result.rating != item["rating"]:
+                        changed.add(item["video_key"])
+        finally:
+            connection.close()
+    return changed
+
+def load_video(key):
+    """Return a stored video as a dict with its metadata, intro_text, narrative and
+    results (VerificationResults in their original order), or None."""
+    connection = _connect()
+    try:
+        video = connection.execute("SELECT * FROM videos WHERE key = ?", (key,)).fetchone()
+        if video is None:
+            return None
+        rows = connection.execute(
+            "SELECT prediction, actual, rating, confidence, model, error, recheck_at FROM predictions "
+            "WHERE video_key = ? ORDER BY position", (key,)
+        ).fetchall()
+    finally:
+        connection.close()
+
+    video = dict(video)
+    video["results"] = [VerificationResult(**dict(row)) for row in rows]
+    return video
+
+def labelled_transcripts(limit=None):
+    """Return stored transcripts whose predictions were extracted from the full text,
+    newest first, as dicts with name, transcript and predictions.
+
+    The extracted predictions label where the predictions in a real transcript are,
+    e.g. to measure the pre-filter's recall. Analyses that used the pre-filter, or
+    were stored before that was recorded, are left out."""
+    connection = _connect()
+    try:
+        rows = connection.execute(
+            "SELECT v.key, v.title, t.transcript FROM transcripts t JOIN videos v ON v.key = t.video_key "
+            "WHERE t.prefiltered = 0 ORDER BY v.analyzed_at DESC" + (" LIMIT ?" if limit else ""),
+            (limit,) if limit else ()
+        ).fetchall()
+        samples = []
+        for row in rows:
+            predictions = connection.execute(
+                "SELECT prediction FROM predictions WHERE video_key = ? ORDER BY position", (row["key"],)
+            ).fetchall()
+            if predictions:
+                samples.append({
+                    "name": row["title"] or row["key"],
+                    "transcript": row["transcript"],
+                    "predictions": [prediction["prediction"] for prediction in predictions]
+                })
+    finally:
+        connection.close()
+    return samples
+
+def save_narrative(key, narrative):
+    """Replace the stored narrative of a video."""
+    with _db_lock:
+        connection = _connect()
+        try:
+            with connection:
+                connection.execute("UPDATE videos SET narrative = ? WHERE key = ?", (narrative, key))
+        finally:
+            connection.close()
+
+def _fts_query(text):
+    """Turn free text into an FTS5 query matching every word, with FTS syntax quoted away."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+def _prediction_filters(text, rating):
+    """Build the FROM clause over predictions (as p), its WHERE conditions and parameters."""
+    from_clause = "predictions p"
+    clauses = []
+    params = []
+
+    if text and FTS5_AVAILABLE:
+        from_clause = "predictions_fts f JOIN predictions p ON p.id = f.rowid"
+        clauses.append("predictions_fts MATCH ?")
+        params.append(_fts_query(text))
+    elif text:
+        for word in text.split():
+            clauses.append("p.prediction LIKE ?")
+            params.append(f"%{word}%")
+    if rating:
+        clauses.append("p.rating = ?")
+        params.append(rating)
+    return from_clause, clauses, params
+
+def _video_filters(channel, since):
+    """Build the WHERE conditions over videos (as v) and their parameters."""
+    clauses = []
+    params = []
+    if channel:
+        clauses.append("v.channel = ? COLLATE NOCASE")
+        params.append(channel)
+    if since:
+        clauses.append("v.upload_date >= ?")
+        params.append(since)
+    return clauses, params
+
+def _where(clauses):
+    return f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+def search_predictions(text=None, channel=None, rating=None, since=None, limit=50):
+    """Search stored predictions across videos.
+
+    text must match every word through the full-text index, best matches first;
+    without text the most recently stored predictions come first. channel, rating
+    and since (an ISO upload date) narrow the results. Returns dicts with the
+    prediction, its verdict and its video."""
+    from_clause, clauses, params = _prediction_filters(text, rating)
+    video_clauses, video_params = _video_filters(channel, since)
+    order = "f.rank" if text and FTS5_AVAILABLE else "p.id DESC"
+
+    connection = _connect()
+    try:
+        rows = connection.execute(
+            "SELECT p.prediction, p.rating, p.actual, p.recheck_at, v.key AS video_key, v.title, v.channel, v.upload_date, v.url "
+            f"FROM {from_clause} JOIN videos v ON v.key = p.video_key{_where(clauses + video_clauses)} "
+            f"ORDER BY {order} LIMIT ?",
+            params + video_params + [limit]
+        ).fetchall()
+    finally:
+        connection.close()
+    return [dict(row) for row in rows]
+
+def count_predictions(text=None, channel=None, rating=None, since=None):
+    """Count the predictions search_predictions would match, per channel and rating.
+
+    Returns {channel: {rating: count}} with the channels with most predictions first."""
+    from_clause, clauses, params = _prediction_filters(text, rating)
+    video_clauses, video_params = _video_filters(channel, since)
+
+    connection = _connect()
+    try:
+        # Counting per video first keeps the join to videos at one row per video and rating
+        rows = connection.execute(
+            "SELECT v.channel AS channel, c.rating AS rating, SUM(c.count) AS count FROM ("
+            f"SELECT p.video_key AS video_key, p.rating AS rating, COUNT(*) AS count FROM {from_clause}{_where(clauses)} "
+            "GROUP BY p.video_key, p.rating"
+            f") c JOIN videos v ON v.key = c.video_key{_where(video_clauses)} GROUP BY v.channel, c.rating",
+            params + video_params
+        ).fetchall()
+    finally:
+        connection.close()
+
+    counts = {}
+    for row in rows:
+        counts.setdefault(row["channel"] or "Unknown", {})[row["rating"]] = row["count"]
+    return dict(sorted(counts.items(), key=lambda item: -sum(item[1].values())))
@@ -2,31 +2,85 @@ import openai
 import json
 import requests
 import logging
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
 from projectY_modules import prompts
-from projectY_modules.config import OPENAI_API_KEY, PERPLEXITY_API_KEY
+from projectY_modules import clients
+from projectY_modules import resilience
+from projectY_modules import hedging
+from projectY_modules import prediction_dates
+from projectY_modules import prediction_dedupe
+from projectY_modules import verification_cache
+from projectY_modules import results
+from projectY_modules import token_budget
+from projectY_modules import utilities
+from projectY_modules.config import (
+    VERIFY_MAX_WORKERS,
+    VERIFY_BATCH_SIZE,
+    DEDUPE_ENABLED,
+    VERIFY_CACHE_ENABLED,
+    VERIFY_TIERED,
+    VERIFY_HEDGE_ENABLED,
+    DATE_CHECK_ENABLED
+)
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
 
+VERIFY_MODEL = "gpt-4o"
+PERPLEXITY_MODEL = "sonar-reasoning-pro"
+
+# Fast, cheap first tier of tiered verification; only its UNCLEAR or
+# low-confidence verdicts are escalated to PERPLEXITY_MODEL
+PERPLEXITY_FAST_MODEL = "sonar"
+
+# Expected reply sizes: a one-line summary plus rating. The reasoning model's
+# <think> block has no predictable size, and a reply cut off inside it cannot be
+# parsed, so it gets its full output limit
+VERIFY_EXPECTED_TOKENS = 120
+PERPLEXITY_EXPECTED_TOKENS = {
+    PERPLEXITY_FAST_MODEL: 200,
+    PERPLEXITY_MODEL: token_budget.get_limits(PERPLEXITY_MODEL)["output"]
+}
+
+# Extra reply tokens per prediction in a batch request
+PERPLEXITY_BATCH_TOKENS_PER_PREDICTION = 120
+
 def verify_prediction(prediction, search_snippets):
     """Use GPT-4o to verify if a prediction is TRUE, FALSE, UNCLEAR, or NOT YET,
-       and extract the key event from search results."""
+       and extract the key event from search results. Returns a VerificationResult."""
     logger.debug(f"Verifying prediction with GPT-4o: {prediction}")
     
     try:
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
+        client = clients.get_openai_client()
+        max_tokens = token_budget.max_tokens_for(VERIFY_MODEL, VERIFY_EXPECTED_TOKENS)
+        system_message = {"role": "system", "content": "You are an AI that verifies predictions using real-time Google search results."}
+
+        # Keep as many search results as fit next to the prompt
+        search_snippets = token_budget.fit_text(
+            search_snippets,
+            VERIFY_MODEL,
+            [system_message, {"role": "user", "content": prompts.verify_prediction_prompt.format(prediction=prediction, search_snippets="")}],
+            max_tokens,
+            label="search results"
+        )
         prompt = prompts.verify_prediction_prompt.format(prediction=prediction, search_snippets=search_snippets)
+        messages = [system_message, {"role": "user", "content": prompt}]
+        prompt_tokens = token_budget.check_request(VERIFY_MODEL, messages, max_tokens)
         
         logger.debug("Sending request to GPT-4o...")
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "system", "content": "You are an AI that verifies predictions using real-time Google search results."},
-                      {"role": "user", "content": prompt}],
-            max_tokens=150  # Increased token limit for a better response
-        )
+        response = resilience.call("openai", lambda timeout: client.chat.completions.create(
+            model=VERIFY_MODEL,
+            messages=messages,
+            max_tokens=max_tokens,
+            response_format=results.openai_response_format("verification", results.VERIFICATION_SCHEMA),
+            timeout=clients.openai_timeout(timeout)
+        ))
         logger.debug("Received response from GPT-4o")
+        token_budget.record_usage(VERIFY_MODEL, response.usage, prompt_tokens, label="GPT-4o verification")
         
-        result = response.choices[0].message.content.strip()
+        result = results.parse_verification(prediction, response.choices[0].message.content)
+        result.model = VERIFY_MODEL
         logger.debug(f"Verification result: {result}")
         return result
 
@@ -37,50 +91,246 @@ def verify_prediction(prediction, search_snippets):
         logger.error(f"Unexpected error during GPT-4o verification: {str(e)}", exc_info=True)
         raise
 
-def verify_prediction_with_perplexity(prediction):
-    """Use Perplexity API to verify if a prediction is TRUE, FALSE, UNCLEAR, or NOT YET."""
-    logger.info(f"Verifying prediction with Perplexity: {prediction}")
-    
-    headers = {
-        "Authorization": f"Bearer {PERPLEXITY_API_KEY}",
-        "Accept": "application/json",
-        "Content-Type": "application/json"
-    }
+def verify_prediction_with_perplexity(prediction, model=PERPLEXITY_MODEL):
+    """Use Perplexity API to verify if a prediction is TRUE, FALSE, UNCLEAR, or NOT YET.
+
+    The reply is constrained to results.VERIFICATION_SCHEMA and returned as a VerificationResult."""
+    logger.info(f"Verifying prediction with Perplexity ({model}): {prediction}")
 
     # Prompt string from prompts.py
     prompt_text = prompts.verify_prediction_prompt_perplexity.format(prediction=prediction)
+    response_text = _perplexity_completion(
+        prompt_text,
+        PERPLEXITY_EXPECTED_TOKENS[model],
+        results.VERIFICATION_SCHEMA,
+        label=f"Perplexity verification ({model})",
+        model=model
+    )
+    result = results.parse_verification(prediction, response_text)
+    result.model = model
+    return result
+
+def verify_batch_with_perplexity(predictions, model=PERPLEXITY_MODEL):
+    """Verify several predictions in a single Perplexity request.
+
+    Returns one VerificationResult per prediction, in order. Raises
+    results.MalformedReplyError if the reply does not cover every prediction."""
+    logger.info(f"Verifying a batch of {len(predictions)} predictions with Perplexity ({model})")
+
+    prediction_lines = "\n".join(f"{i}. {prediction}" for i, prediction in enumerate(predictions, 1))
+    prompt_text = prompts.verify_predictions_batch_prompt_perplexity.format(predictions=prediction_lines)
+    response_text = _perplexity_completion(
+        prompt_text,
+        PERPLEXITY_EXPECTED_TOKENS[model] + PERPLEXITY_BATCH_TOKENS_PER_PREDICTION * len(predictions),
+        results.BATCH_VERIFICATION_SCHEMA,
+        label=f"Perplexity batch verification ({model}, {len(predictions)} predictions)",
+        model=model
+    )
+    batch_results = results.parse_batch_verification(predictions, response_text)
+    for result in batch_results:
+        result.model = model
+    return batch_results
+
+def _perplexity_completion(prompt_text, expected_tokens, schema, label, model=PERPLEXITY_MODEL):
+    """Send one prompt to a Perplexity model with a JSON schema and return the reply text."""
     logger.debug(f"Using prompt: {prompt_text}")
 
+    messages = [
+        {"role": "system", "content": "You are a helpful AI that verifies predictions using current web knowledge."},
+        {"role": "user", "content": prompt_text}
+    ]
+    max_tokens = token_budget.max_tokens_for(model, expected_tokens)
+    prompt_tokens = token_budget.check_request(model, messages, max_tokens)
+
     payload = {
-        "model": "sonar-reasoning-pro",  # <- try this model; pplx-7b-online is deprecated in some accounts
-        "messages": [
-            {"role": "system", "content": "You are a helpful AI that verifies predictions using current web knowledge."},
-            {"role": "user", "content": prompt_text}
-        ]
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "response_format": results.perplexity_response_format(schema)
     }
 
     try:
         logger.debug("Sending request to Perplexity API...")
-        response = requests.post(
-            "https://api.perplexity.ai/chat/completions",
-            headers=headers,
-            json=payload
-        )
-        response.raise_for_status()
+        response = resilience.call("perplexity", lambda timeout: _post_perplexity(payload, timeout))
         
-        response_text = response.json()["choices"][0]["message"]["content"]
+        response_json = response.json()
+        token_budget.record_usage(model, response_json.get("usage"), prompt_tokens, label=label)
+
+        response_text = response_json["choices"][0]["message"]["content"]
         logger.debug(f"Raw Perplexity response: {response_text}")
         logger.info("Successfully received verification from Perplexity")
         
-        return response_text.strip()
+        return response_text
 
     except requests.exceptions.HTTPError as e:
-        logger.error(f"Perplexity API error: Status code {response.status_code}")
-        logger.error(f"Response text: {response.text}")
+        logger.error(f"Perplexity API error: Status code {e.response.status_code}")
+        logger.error(f"Response text: {e.response.text}")
         raise
     except requests.exceptions.RequestException as e:
         logger.error(f"Network error while calling Perplexity API: {str(e)}")
         raise
     except Exception as e:
         logger.error(f"Unexpected error during Perplexity verification: {str(e)}", exc_info=True)
-        raise
\ No newline at end of file
+        raise
+
+def _post_perplexity(payload, timeout):
+    """POST a chat completion to Perplexity, reading for at most timeout seconds."""
+    connect_timeout, read_timeout = clients.PERPLEXITY_TIMEOUT
+    response = clients.get_perplexity_session().post(
+        clients.PERPLEXITY_API_URL,
+        json=payload,
+        timeout=(connect_timeout, min(read_timeout, timeout))
+    )
+    response.raise_for_status()
+    return response
+
+def needs_escalation(result):
+    """Whether a first-tier verdict should be re-checked by the reasoning model:
+    it failed, is UNCLEAR, or the model said it has low confidence."""
+    return bool(result.error) or result.rating == "UNCLEAR" or result.confidence == "low"
+
+def verify_predictions(predictions, max_workers=None, dedupe=None, use_cache=None, batch_size=None, tiered=None, hedge=None,
+                       date_check=None, reference_date=None):
+    """Verify a list of predictions concurrently with Perplexity.
+
+    With dedupe (on by default), near-identical predictions are clustered first and
+    only one representative per cluster is sent; its verdict is copied to every
+    member. With use_cache (on by default), verdicts from the verification cache are
+    reused and fresh ones are stored. With batch_size above 1, up to that many
+    predictions share one request. With tiered (on by default), predictions go to
+    PERPLEXITY_FAST_MODEL first and only verdicts that need_escalation() are sent
+    on to PERPLEXITY_MODEL; each result's model says which tier settled it. With
+    hedge (off by default), a request still running past the hedge delay is sent
+    again and the first answer wins (see hedging.hedged_call). With date_check (on by
+    default), predictions about a period that has not started yet are answered
+    NOT YET locally with a recheck_at date; reference_date (the video's upload date,
+    or a list with one date per prediction when they come from different videos)
+    resolves relative phrases such as "next year". Predictions with such phrases
+    are deduplicated, cached and verified together with when they were made (see
+    prediction_dates.anchor_relative), so the same words from different years
+    never share a verdict.
+    Returns one VerificationResult per prediction, in the original order. A failed
+    verification or malformed reply gives an UNCLEAR result with "error" set to the
+    reason instead of aborting the batch."""
+    max_workers = max_workers or VERIFY_MAX_WORKERS
+    dedupe = DEDUPE_ENABLED if dedupe is None else dedupe
+    use_cache = VERIFY_CACHE_ENABLED if use_cache is None else use_cache
+    batch_size = max(1, batch_size or VERIFY_BATCH_SIZE)
+    tiered = VERIFY_TIERED if tiered is None else tiered
+    hedge = VERIFY_HEDGE_ENABLED if hedge is None else hedge
+    date_check = DATE_CHECK_ENABLED if date_check is None else date_check
+    if not predictions:
+        return []
+
+    if isinstance(reference_date, (list, tuple)):
+        reference_dates = list(reference_date)
+    else:
+        reference_dates = [reference_date] * len(predictions)
+
+    anchored = [prediction_dates.anchor_relative(prediction, day) for prediction, day in zip(predictions, reference_dates)]
+    if dedupe:
+        unique_predictions, clusters = prediction_dedupe.dedupe_predictions(anchored)
+    else:
+        unique_predictions, clusters = anchored, [[i] for i in range(len(predictions))]
+
+    unique_results = [None] * len(unique_predictions)
+    if date_check:
+        # The date check resolves relative phrases itself, from the original wording
+        unique_results = [
+            prediction_dates.not_yet_result(predictions[members[0]], reference_dates[members[0]])
+            for members in clusters
+        ]
+        settled = sum(1 for result in unique_results if result is not None)
+        if settled:
+            logger.info(f"Answered {settled} predictions about future periods as NOT YET without an API call")
+
+    unchecked = [i for i, result in enumerate(unique_results) if result is None]
+    if use_cache:
+        for i in unchecked:
+            unique_results[i] = verification_cache.get(unique_predictions[i])
+    pending = [i for i in unchecked if unique_results[i] is None]
+    if use_cache:
+        logger.info(f"Verification cache: {len(unchecked) - len(pending)} hits, {len(pending)} misses")
+
+    if pending:
+        # Tier-1 verdicts kept because their escalation failed; not cached so a later run escalates them again
+        kept_after_failed_escalation = set()
+        if tiered:
+            _verify_pending(unique_predictions, unique_results, pending, PERPLEXITY_FAST_MODEL, max_workers, batch_size, hedge)
+            escalated = [i for i in pending if needs_escalation(unique_results[i])]
+            logger.info(
+                f"{PERPLEXITY_FAST_MODEL} settled {len(pending) - len(escalated)} of {len(pending)} predictions, "
+                f"escalating {len(escalated)} to {PERPLEXITY_MODEL}"
+            )
+            if escalated:
+                first_tier = {i: unique_results[i] for i in escalated}
+                _verify_pending(unique_predictions, unique_results, escalated, PERPLEXITY_MODEL, max_workers, batch_size, hedge)
+                for i in escalated:
+                    if unique_results[i].error and not first_tier[i].error:
+                        logger.warning(
+                            f"Escalation to {PERPLEXITY_MODEL} failed ({unique_results[i].error}), keeping the "
+                            f"{PERPLEXITY_FAST_MODEL} verdict: {unique_predictions[i]}"
+                        )
+                        unique_results[i] = first_tier[i]
+                        kept_after_failed_escalation.add(i)
+        else:
+            _verify_pending(unique_predictions, unique_results, pending, PERPLEXITY_MODEL, max_workers, batch_size, hedge)
+
+        if use_cache:
+            for i in pending:
+                if i not in kept_after_failed_escalation:
+                    verification_cache.store(unique_results[i])
+
+        failed = sum(1 for i in pending if unique_results[i].error)
+        if failed:
+            logger.warning(f"{failed} of {len(pending)} verifications failed")
+        else:
+            logger.info(f"Successfully verified all {len(pending)} predictions")
+
+    # Share each representative's verdict with the rest of its cluster
+    verification_results = [None] * len(predictions)
+    for members, result in zip(clusters, unique_results):
+        for i in members:
+            verification_results[i] = dataclasses.replace(result, prediction=predictions[i])
+
+    return verification_results
+
+def _verify_pending(unique_predictions, unique_results, pending, model, max_workers, batch_size, hedge=False):
+    """Verify the predictions at the pending indices with model, writing results into unique_results."""
+    groups = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+    workers = max(1, min(max_workers, len(groups)))
+    logger.info(f"Verifying {len(pending)} predictions with {model} in {len(groups)} requests with up to {workers} at once")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [utilities.submit_in_context(executor, _verify_group, [unique_predictions[i] for i in group], model, hedge) for group in groups]
+
+        for group, future in zip(groups, futures):
+            for i, result in zip(group, future.result()):
+                unique_results[i] = result
+
+def _verify_group(predictions, model=PERPLEXITY_MODEL, hedge=False):
+    """Verify a group of predictions, in one batch request when there are several.
+
+    If the batch request fails or its reply cannot be split back into one verdict
+    per prediction, each prediction is verified on its own. Never raises: failures
+    become failed results."""
+    def send(kind, func):
+        # A hedge is a duplicate of the same request, timed against requests of the same kind
+        return hedging.hedged_call(kind, func, func) if hedge else func()
+
+    if len(predictions) > 1:
+        try:
+            return send(f"{model} batch", lambda: verify_batch_with_perplexity(predictions, model))
+        except Exception as e:
+            logger.warning(f"Batch verification of {len(predictions)} predictions failed ({str(e)}), verifying one at a time")
+
+    group_results = []
+    for prediction in predictions:
+        try:
+            group_results.append(send(model, lambda prediction=prediction: verify_prediction_with_perplexity(prediction, model)))
+        except Exception as e:
+            logger.warning(f"Verification failed for prediction '{prediction}': {str(e)}")
+            failed_result = results.VerificationResult.failed(prediction, e)
+            failed_result.model = model
+            group_results.append(failed_result)
+    return group_results
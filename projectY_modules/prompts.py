@@ -1,9 +1,10 @@
+# Each prompt keeps its static instructions first and the {placeholders} last, so
+# repeated calls share an identical leading prefix that providers can cache.
+# Keep new prompts in the same layout.
 
 #CHATGPT CREATED PROMPT
 extract_predictions_prompt = """
     You are analyzing a conversation transcript. 
-    
-    {intro}
 
     Your goal is to extract **clear, concrete predictions about future OUTCOMES**, 
     avoiding scheduled events, facts, or uncertain statements.
@@ -29,23 +30,28 @@ extract_predictions_prompt = """
     - "Candidate X will win the election" = PREDICTION (outcome)
     - "My burthday will be next week" = SCHEDULED EVENT (fact)
     - "I will receive a lego set for my birthday" = PREDICTION (outcome)
-    
-
-    **Transcript:**
-    {transcript}
 
     **Task:**
-    - Extract **up to 10 of the most important predictions about OUTCOMES** in a numbered list.
+    - Extract **up to 10 of the most important predictions about OUTCOMES**.
     - Focus on predictions about **WHO will win, WHAT will happen, or WHAT the result will be**.
     - Ignore scheduled events, facts, or general statements.
-    - If no predictions are found, respond with: "No clear predictions about outcomes were made in this conversation."
-
-    **Response Format Example:**
-    1. Fenerbahce will win the Champions League game next Tuesday.
-    2. Inflation will decrease by 2% next quarter.
-    3. AI adoption in healthcare will grow significantly in the next five years.
-    4. The player will score at least 20 goals this season.
-    5. Scientists will achieve a major breakthrough in battery technology by 2030.
+    - If no predictions are found, return an empty list.
+
+    **Response Format:**
+    Respond with a JSON object only, with one prediction per list item, e.g.:
+    {{"predictions": [
+        "Fenerbahce will win the Champions League game next Tuesday.",
+        "Inflation will decrease by 2% next quarter.",
+        "AI adoption in healthcare will grow significantly in the next five years.",
+        "The player will score at least 20 goals this season.",
+        "Scientists will achieve a major breakthrough in battery technology by 2030."
+    ]}}
+
+    **Context:**
+    {intro}
+
+    **Transcript:**
+    {transcript}
     """
 
 #ANTHROPIC CREATED PROMPT
@@ -90,6 +96,25 @@ extract_predictions_prompt = """
 
 
 
+rank_predictions_prompt = """
+You are consolidating predictions that were extracted from different parts of the same conversation transcript.
+
+**Task:**
+- Merge candidates that describe the same prediction into a single clear statement.
+- Drop anything that is a scheduled event, a fact, or a vague statement rather than a prediction about an OUTCOME.
+- Select **up to {max_predictions} of the most important predictions about OUTCOMES**, most important first.
+
+**Response Format:**
+Respond with a JSON object only, e.g.:
+{{"predictions": ["Fenerbahce will win the Champions League game next Tuesday.", "Inflation will decrease by 2% next quarter."]}}
+
+**Context:**
+{intro}
+
+**Candidate predictions:**
+{candidates}
+"""
+
 generate_search_query_prompt = """
 You are an expert at transforming predictions into precise Google search queries to verify if the prediction came true.
 
@@ -116,11 +141,7 @@ Your goal is to generate a search query that will return clear, factual informat
 
 verify_prediction_prompt = """
 You are verifying whether a prediction has come true using real-time Google search results.
-
-**Prediction:** "{prediction}"
-
-**Search Results:**
-{search_snippets}
+The prediction and the search results are given at the end.
 
 **Your Task:**
 1. Summarize what actually happened based on the search results. Include details that help confirm or refute the prediction.
@@ -135,36 +156,55 @@ If the search results mention a future date or say the event is upcoming, classi
 
 If there is no useful information at all, say "No clear result found" and classify as UNCLEAR.
 
-**Response Format Example:**
-Actual Result: "Portugal has not yet played the Euro 2024 final. The tournament ends July 14, 2024."
-Rating: NOT YET
+Also say how confident you are in the classification: "high", "medium" or "low".
+
+**Response Format:**
+Respond with a JSON object only, e.g.:
+{{"actual_result": "Portugal has not yet played the Euro 2024 final. The tournament ends July 14, 2024.", "rating": "NOT YET", "confidence": "high"}}
+
+**Prediction:** "{prediction}"
+
+**Search Results:**
+{search_snippets}
 """
 verify_prediction_prompt_perplexity = """
-I am verifying a prediction. Based on the most current available web information, please classify this prediction.
+I am verifying a prediction. Based on the most current available web information, please classify the prediction given at the end.
+
+Classify the prediction as one of the following:
+- TRUE → It happened as predicted.
+- FALSE → It did not happen.
+- NOT YET → The event is in the future and hasn't occurred yet.
+- UNCLEAR → Not enough evidence, or conflicting sources.
+
+Respond with a JSON object only, holding a brief summary of the current status, the classification and how confident you are in it:
+
+{{"actual_result": "[summary]", "rating": "TRUE" | "FALSE" | "NOT YET" | "UNCLEAR", "confidence": "high" | "medium" | "low"}}
 
 Prediction: "{prediction}"
+"""
 
-Classify the prediction as one of the following:
+verify_predictions_batch_prompt_perplexity = """
+I am verifying several predictions. Based on the most current available web information, please classify each numbered prediction given at the end on its own.
+
+Classify each prediction as one of the following:
 - TRUE → It happened as predicted.
 - FALSE → It did not happen.
 - NOT YET → The event is in the future and hasn't occurred yet.
 - UNCLEAR → Not enough evidence, or conflicting sources.
 
-Respond with a brief summary of the current status, then the classification like this:
+Respond with a JSON object only, with one entry per prediction holding its number, a brief summary of its current status, its classification and how confident you are in it:
 
-Actual Result: [summary]
-Rating: TRUE/FALSE/NOT YET/UNCLEAR
+{{"results": [{{"index": 1, "actual_result": "[summary]", "rating": "TRUE" | "FALSE" | "NOT YET" | "UNCLEAR", "confidence": "high" | "medium" | "low"}}, ...]}}
+
+Predictions:
+{predictions}
 """
 
 generate_narrative_prompt = """
 You are a podcast host summarizing a YouTube video that contains a number of predictions. 
 Your goal is to walk the audience through each prediction, what actually happened, and whether it came true — 
 all in a tone that’s fun, conversational, and informative, but always respectful.
-
-**Video Title**: {video_title}
-**Intro Context**: {intro_text}
-**Predictions and Ratings**:
-{predictions_block}
+The video details and the predictions with their ratings are given at the end.
 
 **Format your response like this**:
 Intro:
@@ -185,4 +225,10 @@ Conclusion:
 - Be brief but vivid — aim for 60–90 seconds per prediction if read aloud.
 
 Do not include markdown formatting or a numbered list. Just clearly mark the sections: Intro:, Prediction 1:, Prediction 2:, etc., Conclusion:
+
+**Video Title**: {video_title}
+**Video Details**: {video_details}
+**Intro Context**: {intro_text}
+**Predictions and Ratings**:
+{predictions_block}
 """
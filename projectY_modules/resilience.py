@@ -0,0 +1,233 @@
+"""
+Resilience layer for ProjectY's upstream APIs.
+Wraps every OpenAI and Perplexity call with a per-call deadline, retries
+throttled and transient failures with exponential backoff and jitter (honoring
+Retry-After), and trips a per-provider circuit breaker after repeated failures
+so a broken upstream fails fast instead of stalling the run. Retry counts and
+the time lost to throttling are kept per analysis for reporting.
+"""
+
+import time
+import random
+import threading
+import contextvars
+import logging
+from email.utils import parsedate_to_datetime
+import openai
+import requests
+from projectY_modules.config import (
+    API_MAX_RETRIES,
+    API_CALL_DEADLINE_SECONDS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS
+)
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: throttling and server-side failures
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while its circuit breaker is open."""
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call and its retries run out of time."""
+
+class CircuitBreaker:
+    """Per-provider breaker: opens after failure_threshold consecutive transient
+    failures, rejects calls for reset_seconds, then lets one trial call through."""
+
+    def __init__(self, provider, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_running:
+                raise CircuitOpenError(f"{self.provider} circuit breaker is open after repeated failures")
+            # Half-open: let a single trial call through
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Opening {self.provider} circuit breaker after {self._failures} consecutive failures")
+                    current_stats().add(self.provider, circuit_opens=1)
+                self._opened_at = time.monotonic()
+
+class RetryStats:
+    """Thread-safe counters of calls, retries and time spent waiting, per provider."""
+
+    FIELDS = ("calls", "retries", "throttled", "throttle_seconds", "backoff_seconds", "failures", "circuit_opens")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._providers = {}
+
+    def add(self, provider, **counts):
+        with self._lock:
+            totals = self._providers.setdefault(provider, dict.fromkeys(self.FIELDS, 0))
+            for field, value in counts.items():
+                totals[field] += value
+
+    def summary(self):
+        with self._lock:
+            return {provider: dict(totals) for provider, totals in self._providers.items()}
+
+# Counters for calls made outside an analysis started with start_run
+_stats = RetryStats()
+
+# Counters of the analysis running in this context
+_run_stats = contextvars.ContextVar("projecty_retry_stats", default=None)
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(provider):
+    """Return the shared circuit breaker for a provider."""
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+def _status_and_headers(error):
+    """Return the HTTP status and response headers behind an API error, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None, {}
+    return getattr(response, "status_code", None), getattr(response, "headers", None) or {}
+
+def is_retryable(error):
+    """Whether an error is throttling or a transient failure worth retrying."""
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, (openai.APIStatusError, requests.exceptions.HTTPError)):
+        status, _ = _status_and_headers(error)
+        return status in RETRYABLE_STATUSES
+    return False
+
+def retry_after_seconds(error):
+    """Read the server's requested wait from Retry-After (seconds or HTTP date) or retry-after-ms."""
+    _, headers = _status_and_headers(error)
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given retry attempt (1-based)."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+
+def call(provider, func, max_retries=API_MAX_RETRIES, deadline=API_CALL_DEADLINE_SECONDS):
+    """Call func(timeout) with retries, backoff and the provider's circuit breaker.
+
+    func receives the seconds left before the deadline and should use them as its
+    request timeout. Throttled and transient failures are retried up to max_retries
+    times, waiting as long as Retry-After asks or an exponential, jittered delay;
+    other errors are raised at once. Raises DeadlineExceededError when the next wait
+    would pass the deadline and CircuitOpenError if the provider's breaker is open
+    when the call starts. Throttling (429 or Retry-After) does not count towards the
+    breaker, and a call already under way is not cut off by it between retries."""
+    breaker = get_breaker(provider)
+    stats = current_stats()
+    started = time.monotonic()
+    attempt = 0
+
+    breaker.before_call()
+    while True:
+        remaining = deadline - (time.monotonic() - started)
+        stats.add(provider, calls=1)
+
+        try:
+            result = func(remaining)
+        except Exception as e:
+            if not is_retryable(e):
+                # The provider is reachable; the request itself was bad, so the breaker stays closed
+                breaker.record_success()
+                raise
+
+            status, _ = _status_and_headers(e)
+            server_wait = retry_after_seconds(e)
+            throttled = status == 429 or server_wait is not None
+            if not throttled:
+                # Only server errors, timeouts and lost connections say the provider is down
+                breaker.record_failure()
+            stats.add(provider, failures=1)
+            attempt += 1
+            if attempt > max_retries:
+                logger.error(f"{provider} call failed after {max_retries} retries: {str(e) or f'HTTP {status}'}")
+                raise
+
+            delay = server_wait if server_wait is not None else backoff_delay(attempt)
+
+            if time.monotonic() - started + delay >= deadline:
+                raise DeadlineExceededError(
+                    f"{provider} call gave up after {time.monotonic() - started:.1f}s: "
+                    f"waiting {delay:.1f}s more would pass its {deadline:.0f}s deadline"
+                ) from e
+
+            if throttled:
+                stats.add(provider, retries=1, throttled=1, throttle_seconds=delay)
+            else:
+                stats.add(provider, retries=1, backoff_seconds=delay)
+            logger.warning(f"{provider} call failed ({str(e) or f'HTTP {status}'}), retry {attempt}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
+
+def current_stats():
+    """Return the retry counters of the analysis running in this context."""
+    return _run_stats.get() or _stats
+
+def start_run():
+    """Give the analysis running in this context retry counters of its own and return them.
+
+    Circuit breakers stay shared: they track the health of the provider, not of a run."""
+    stats = RetryStats()
+    _run_stats.set(stats)
+    return stats
+
+def stats_summary():
+    """Return the retry counters per provider of the analysis running in this context."""
+    return current_stats().summary()
+
+def format_stats(summary):
+    """Format retry counters as one line per provider."""
+    if not summary:
+        return "No API calls made"
+    return "\n".join(
+        f"{provider}: {totals['calls']} attempts, {totals['retries']} retries "
+        f"({totals['throttled']} throttled, {totals['throttle_seconds']:.1f}s lost to throttling, "
+        f"{totals['backoff_seconds']:.1f}s backing off), {totals['circuit_opens']} circuit breaker trips"
+        for provider, totals in summary.items()
+    )
@@ -0,0 +1,185 @@
+"""
+Structured model outputs for ProjectY.
+JSON schemas the extraction and verification models must answer with, and the
+single place their replies are parsed into typed results.
+"""
+
+import re
+import json
+import logging
+from dataclasses import dataclass, asdict
+from typing import Optional
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+RATINGS = ["TRUE", "FALSE", "NOT YET", "UNCLEAR"]
+
+CONFIDENCE_LEVELS = ["high", "medium", "low"]
+
+PREDICTIONS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "predictions": {
+            "type": "array",
+            "items": {"type": "string"}
+        }
+    },
+    "required": ["predictions"],
+    "additionalProperties": False
+}
+
+VERIFICATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "actual_result": {"type": "string"},
+        "rating": {"type": "string", "enum": RATINGS},
+        "confidence": {"type": "string", "enum": CONFIDENCE_LEVELS}
+    },
+    "required": ["actual_result", "rating", "confidence"],
+    "additionalProperties": False
+}
+
+BATCH_VERIFICATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer"},
+                    "actual_result": {"type": "string"},
+                    "rating": {"type": "string", "enum": RATINGS},
+                    "confidence": {"type": "string", "enum": CONFIDENCE_LEVELS}
+                },
+                "required": ["index", "actual_result", "rating", "confidence"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["results"],
+    "additionalProperties": False
+}
+
+class MalformedReplyError(ValueError):
+    """A model reply did not match the expected JSON schema."""
+
+@dataclass
+class VerificationResult:
+    """The verdict for one prediction."""
+
+    prediction: str
+    actual: str = "Not found"
+    rating: str = "UNCLEAR"
+    error: Optional[str] = None
+    cached: bool = False
+    confidence: Optional[str] = None
+    model: Optional[str] = None
+    recheck_at: Optional[str] = None
+
+    @classmethod
+    def failed(cls, prediction, error):
+        """A result for a prediction whose verification raised an error."""
+        return cls(prediction=prediction, actual=f"Verification failed: {error}", error=str(error))
+
+    def to_dict(self):
+        return asdict(self)
+
+def openai_response_format(name, schema):
+    """Build the OpenAI response_format that constrains a reply to schema."""
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+def perplexity_response_format(schema):
+    """Build the Perplexity response_format that constrains a reply to schema."""
+    return {"type": "json_schema", "json_schema": {"schema": schema}}
+
+def parse_json_reply(text):
+    """Load the JSON object from a model reply.
+
+    Reasoning models put a <think> block before the answer and some models wrap
+    JSON in a code fence; both are stripped before parsing."""
+    text = re.sub(r"<think>.*?</think>", "", text or "", flags=re.DOTALL).strip()
+    match = re.search(r"\{.*\}", text, flags=re.DOTALL)
+    if not match:
+        raise MalformedReplyError(f"Reply contains no JSON object: {text[:200]!r}")
+
+    try:
+        data = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise MalformedReplyError(f"Reply is not valid JSON ({str(e)}): {text[:200]!r}")
+
+    if not isinstance(data, dict):
+        raise MalformedReplyError(f"Reply JSON is not an object: {text[:200]!r}")
+    return data
+
+def parse_predictions(text):
+    """Parse an extraction or ranking reply into a list of prediction strings."""
+    data = parse_json_reply(text)
+    predictions = data.get("predictions")
+    if not isinstance(predictions, list):
+        raise MalformedReplyError(f"Reply has no predictions list: {text[:200]!r}")
+    return [prediction.strip() for prediction in predictions if isinstance(prediction, str) and prediction.strip()]
+
+def parse_verification(prediction, text):
+    """Parse a verification reply into a VerificationResult for prediction."""
+    return _verification_from_data(prediction, parse_json_reply(text))
+
+def parse_batch_verification(predictions, text):
+    """Parse a batch verification reply into one VerificationResult per prediction, in order.
+
+    Items are matched to predictions by their 1-based index. The reply must cover
+    every prediction exactly once."""
+    items = parse_json_reply(text).get("results")
+    if not isinstance(items, list):
+        raise MalformedReplyError(f"Batch reply has no results list: {text[:200]!r}")
+
+    by_index = {}
+    for item in items:
+        index = item.get("index") if isinstance(item, dict) else None
+        if not isinstance(index, int) or not 1 <= index <= len(predictions) or index in by_index:
+            raise MalformedReplyError(f"Batch reply has an invalid or repeated index {index!r}")
+        by_index[index] = _verification_from_data(predictions[index - 1], item)
+
+    if len(by_index) != len(predictions):
+        missing = [i for i in range(1, len(predictions) + 1) if i not in by_index]
+        raise MalformedReplyError(f"Batch reply is missing predictions {missing}")
+    return [by_index[i] for i in range(1, len(predictions) + 1)]
+
+def _verification_from_data(prediction, data):
+    rating = str(data.get("rating", "")).strip().upper()
+    if rating not in RATINGS:
+        raise MalformedReplyError(f"Reply has an unknown rating {data.get('rating')!r}")
+
+    actual = str(data.get("actual_result") or "").strip() or "Not found"
+    # Confidence is advisory: a reply without a valid one is kept with confidence None
+    confidence = str(data.get("confidence") or "").strip().lower()
+    confidence = confidence if confidence in CONFIDENCE_LEVELS else None
+    return VerificationResult(prediction=prediction, actual=actual, rating=rating, confidence=confidence)
+
+def count_cache_hits(verification_results):
+    """Return (hits, misses) of the verification cache over a list of results."""
+    hits = sum(1 for result in verification_results if result.cached)
+    return hits, len(verification_results) - hits
+
+def count_models(verification_results):
+    """Count freshly verified results per model that settled them; cached and failed results are left out."""
+    counts = {}
+    for result in verification_results:
+        if result.model and not result.cached and not result.error:
+            counts[result.model] = counts.get(result.model, 0) + 1
+    return counts
+
+def format_model_counts(counts):
+    """Format per-model counts as "model: n (share%)" parts, e.g. for the share settled at each tier."""
+    total = sum(counts.values())
+    if not total:
+        return "no fresh verifications"
+    return ", ".join(f"{model}: {count} ({count / total:.0%})" for model, count in counts.items())
+
+def count_ratings(verification_results):
+    """Count results per rating, in RATINGS order."""
+    counts = {rating: 0 for rating in RATINGS}
+    for result in verification_results:
+        counts[result.rating] = counts.get(result.rating, 0) + 1
+    return counts
@@ -0,0 +1,215 @@
+"""
+Token accounting for ProjectY.
+Counts prompt tokens locally before a request is sent, trims variable inputs to
+fit each model's context window, sizes max_tokens from the expected output and
+records the prompt, cached prompt and completion tokens of every call, per
+analysis.
+"""
+
+import math
+import threading
+import contextvars
+import logging
+
+# Try to import tiktoken, but handle gracefully if not available
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+# Context window and output limit of every model ProjectY calls
+MODEL_LIMITS = {
+    "gpt-4-turbo": {"context": 128000, "output": 4096},
+    "gpt-4o": {"context": 128000, "output": 16384},
+    "sonar": {"context": 128000, "output": 8192},
+    "sonar-reasoning-pro": {"context": 128000, "output": 8192},
+}
+
+# Conservative limits for models missing from MODEL_LIMITS
+DEFAULT_LIMITS = {"context": 8192, "output": 4096}
+
+# Tokens added per chat message for role and separators, plus the reply primer
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+# Headroom on top of the expected output so replies are not cut off
+OUTPUT_HEADROOM = 1.25
+
+# Tokens kept free in the context window to absorb counting error
+CONTEXT_SAFETY_MARGIN = 256
+
+# Characters per token when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+def get_limits(model):
+    """Return the context and output limits for a model."""
+    return MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+
+def _get_encoding(model):
+    """Return the tiktoken encoding for a model, falling back to cl100k_base for unknown models."""
+    with _encodings_lock:
+        if model not in _encodings:
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("cl100k_base")
+        return _encodings[model]
+
+def count_tokens(text, model=None):
+    """Count the tokens in text, exactly with tiktoken or estimated from its length otherwise."""
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        return len(_get_encoding(model or "gpt-4o").encode(text, disallowed_special=()))
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def count_message_tokens(messages, model=None):
+    """Count the prompt tokens of a list of chat messages."""
+    return sum(count_tokens(message["content"], model) + TOKENS_PER_MESSAGE for message in messages) + TOKENS_PER_REPLY
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """Cut text down to at most max_tokens tokens, keeping the beginning."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+
+    if TIKTOKEN_AVAILABLE:
+        encoding = _get_encoding(model or "gpt-4o")
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+    # Cut on a word boundary so the estimate stays on the safe side
+    truncated = text[:max_tokens * CHARS_PER_TOKEN]
+    return truncated.rsplit(" ", 1)[0] if " " in truncated else truncated
+
+def max_tokens_for(model, expected_tokens):
+    """Pick max_tokens for a call from the expected size of its reply, capped at the model's output limit."""
+    return min(get_limits(model)["output"], math.ceil(expected_tokens * OUTPUT_HEADROOM))
+
+def input_budget(model, messages, max_tokens):
+    """Return how many tokens of variable input still fit next to messages and the reply."""
+    used = count_message_tokens(messages, model) + max_tokens + CONTEXT_SAFETY_MARGIN
+    return max(0, get_limits(model)["context"] - used)
+
+def fit_text(text, model, messages, max_tokens, label="input"):
+    """Truncate text so it fits in a prompt built from messages plus text.
+
+    messages are the prompt messages without the variable text. A warning is
+    logged when anything is cut."""
+    budget = input_budget(model, messages, max_tokens)
+    tokens = count_tokens(text, model)
+    if tokens <= budget:
+        return text
+
+    logger.warning(f"Truncating {label} from {tokens} to {budget} tokens to fit the {model} context window")
+    return truncate_to_tokens(text, budget, model)
+
+def check_request(model, messages, max_tokens):
+    """Count a request's prompt tokens and fail before sending if it cannot fit the model's context window."""
+    prompt_tokens = count_message_tokens(messages, model)
+    context = get_limits(model)["context"]
+    if prompt_tokens + max_tokens > context:
+        raise ValueError(
+            f"Request to {model} needs {prompt_tokens} prompt tokens plus {max_tokens} for the reply, "
+            f"more than its {context}-token context window"
+        )
+    logger.debug(f"Sending {prompt_tokens} prompt tokens to {model} (max_tokens={max_tokens})")
+    return prompt_tokens
+
+class UsageTracker:
+    """Thread-safe running totals of the tokens used per model."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def record(self, model, prompt_tokens, completion_tokens, cached_tokens=0):
+        with self._lock:
+            totals = self._models.setdefault(model, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += prompt_tokens or 0
+            totals["cached_tokens"] += cached_tokens or 0
+            totals["completion_tokens"] += completion_tokens or 0
+
+    def summary(self):
+        """Return the totals per model and overall."""
+        with self._lock:
+            models = {model: dict(totals) for model, totals in self._models.items()}
+        prompt_tokens = sum(totals["prompt_tokens"] for totals in models.values())
+        cached_tokens = sum(totals["cached_tokens"] for totals in models.values())
+        return {
+            "calls": sum(totals["calls"] for totals in models.values()),
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "cache_hit_percent": 100 * cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+            "completion_tokens": sum(totals["completion_tokens"] for totals in models.values()),
+            "models": models
+        }
+
+# Tracker for calls made outside an analysis started with start_run
+usage_tracker = UsageTracker()
+
+# Tracker of the analysis running in this context
+_run_tracker = contextvars.ContextVar("projecty_usage_tracker", default=None)
+
+def current_tracker():
+    """Return the usage tracker of the analysis running in this context."""
+    return _run_tracker.get() or usage_tracker
+
+def start_run():
+    """Give the analysis running in this context a tracker of its own and return it.
+
+    Concurrent analyses (e.g. two Streamlit sessions) then each count only their
+    own calls. Work handed to a thread pool must be submitted with
+    utilities.submit_in_context to be counted."""
+    tracker = UsageTracker()
+    _run_tracker.set(tracker)
+    return tracker
+
+def record_usage(model, usage, estimated_prompt_tokens=None, label=None):
+    """Record the token usage reported for a call.
+
+    usage may be an OpenAI usage object or a usage dict from a JSON reply. Cached
+    prompt tokens are read from prompt_tokens_details.cached_tokens when the provider
+    reports them. When the provider reports nothing, the locally counted prompt
+    tokens are recorded instead."""
+    if usage is None:
+        prompt_tokens, completion_tokens, details = estimated_prompt_tokens, 0, None
+    elif isinstance(usage, dict):
+        prompt_tokens, completion_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        details = usage.get("prompt_tokens_details")
+    else:
+        prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+
+    if isinstance(details, dict):
+        cached_tokens = details.get("cached_tokens") or 0
+    else:
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+
+    current_tracker().record(model, prompt_tokens, completion_tokens, cached_tokens)
+    logger.info(f"{label or model}: {prompt_tokens} prompt ({cached_tokens} cached) + {completion_tokens} completion tokens")
+
+def usage_summary():
+    """Return the tokens recorded by the analysis running in this context."""
+    return current_tracker().summary()
+
+def format_usage(summary):
+    """Format a usage summary as one line per model."""
+    lines = [
+        f"{model}: {totals['calls']} calls, {totals['prompt_tokens']} prompt ({totals['cached_tokens']} cached) "
+        f"+ {totals['completion_tokens']} completion tokens"
+        for model, totals in summary["models"].items()
+    ]
+    lines.append(
+        f"Total: {summary['prompt_tokens']} prompt + {summary['completion_tokens']} completion tokens, "
+        f"{summary['cache_hit_percent']:.1f}% of prompt tokens served from the provider cache"
+    )
+    return "\n".join(lines)
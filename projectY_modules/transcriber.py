@@ -1,16 +1,32 @@
 import os
+import shutil
+import tempfile
+import threading
 import openai
 import logging
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from projectY_modules import audio_splitter
+from projectY_modules import clients
+from projectY_modules import resilience
+from projectY_modules import transcript_cache
+from projectY_modules import utilities
+from projectY_modules.config import (
+    TRANSCRIBE_MAX_WORKERS,
+    TRANSCRIBE_CHUNK_RETRIES,
+    TRANSCRIPTION_BACKEND,
+    LOCAL_WHISPER_MODEL,
+    LOCAL_WHISPER_COMPUTE_TYPE,
+    LOCAL_WHISPER_CHUNK_SECONDS,
+    TRANSCRIBE_READ_TIMEOUT
+)
 
-# Try to import pydub, but handle gracefully if not available
+# Try to import faster-whisper, but handle gracefully if not available
 try:
-    import pydub
-    PYDUB_AVAILABLE = True
+    import faster_whisper
+    FASTER_WHISPER_AVAILABLE = True
 except ImportError:
-    PYDUB_AVAILABLE = False
-    logging.warning("pydub not available. Large file splitting will be disabled.")
-
-from projectY_modules.config import OPENAI_API_KEY
+    FASTER_WHISPER_AVAILABLE = False
 
 # Set up logger for this module
 logger = logging.getLogger(__name__)
@@ -18,58 +34,156 @@ logger = logging.getLogger(__name__)
 # Whisper API file size limit (25MB)
 WHISPER_MAX_FILE_SIZE = 25 * 1024 * 1024
 
-def transcribe_audio(file_path):
-    """Sends an audio file to OpenAI's Whisper API, saves the transcript, and returns it."""
-    logger.info("Starting audio transcription...")
-    
+class TranscriptionBackend(ABC):
+    """Interface for engines that turn a single audio file into text.
+
+    Chunking, caching and saving are shared by all backends; a backend only
+    describes its limits and transcribes one file or chunk at a time."""
+
+    name = None
+
+    # Largest file a single request accepts in bytes, None for no limit
+    max_file_size = None
+
+    # Longest chunk in seconds the backend should get at once, None for no limit
+    max_chunk_seconds = None
+
+    # Number of chunks transcribed at the same time
+    max_workers = 1
+
+    @abstractmethod
+    def transcribe_file(self, file_path):
+        """Transcribe one audio file or chunk and return its text."""
+
+class OpenAIWhisperBackend(TranscriptionBackend):
+    """OpenAI's hosted whisper-1 model."""
+
+    name = "openai"
+    max_file_size = WHISPER_MAX_FILE_SIZE
+    max_workers = TRANSCRIBE_MAX_WORKERS
+
+    def __init__(self):
+        self.client = clients.get_transcription_client()
+
+    def transcribe_file(self, file_path):
+        """Upload a file to Whisper, retrying throttled or failed uploads (TRANSCRIBE_CHUNK_RETRIES times)."""
+        def upload(timeout):
+            # Reopen the file on every attempt so a retry sends it from the start
+            with open(file_path, "rb") as audio_file:
+                logger.debug(f"Sending {file_path} to Whisper API")
+                return self.client.audio.transcriptions.create(
+                    model="whisper-1",
+                    file=audio_file,
+                    timeout=clients.openai_timeout(timeout, TRANSCRIBE_READ_TIMEOUT)
+                )
+
+        response = resilience.call(
+            "openai",
+            upload,
+            max_retries=TRANSCRIBE_CHUNK_RETRIES,
+            deadline=TRANSCRIBE_READ_TIMEOUT * (TRANSCRIBE_CHUNK_RETRIES + 1)
+        )
+        return response.text
+
+class LocalWhisperBackend(TranscriptionBackend):
+    """A Whisper model running on the local CPU through faster-whisper (CTranslate2, int8 by default).
+
+    Audio is fed in chunks of LOCAL_WHISPER_CHUNK_SECONDS so memory stays bounded
+    on long episodes. Chunks run one at a time because the model already uses
+    every CPU core."""
+
+    name = "local"
+    max_chunk_seconds = LOCAL_WHISPER_CHUNK_SECONDS
+
+    def __init__(self):
+        if not FASTER_WHISPER_AVAILABLE:
+            raise ValueError("faster-whisper is not installed. Install it with 'pip install faster-whisper' to use the local backend.")
+
+        logger.info(f"Loading local Whisper model '{LOCAL_WHISPER_MODEL}' ({LOCAL_WHISPER_COMPUTE_TYPE}) on CPU...")
+        self.model = faster_whisper.WhisperModel(
+            LOCAL_WHISPER_MODEL,
+            device="cpu",
+            compute_type=LOCAL_WHISPER_COMPUTE_TYPE
+        )
+
+    def transcribe_file(self, file_path):
+        logger.debug(f"Transcribing {file_path} with local Whisper model")
+        segments, _ = self.model.transcribe(file_path, beam_size=1)
+        return " ".join(segment.text.strip() for segment in segments)
+
+TRANSCRIPTION_BACKENDS = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    LocalWhisperBackend.name: LocalWhisperBackend
+}
+
+# Backends are created once per process; loading a local model takes seconds
+_backend_instances = {}
+_backend_lock = threading.Lock()
+
+def get_backend(name=None):
+    """Return the shared instance of a transcription backend by name."""
+    name = name or TRANSCRIPTION_BACKEND
+    if name not in TRANSCRIPTION_BACKENDS:
+        raise ValueError(f"Unknown transcription backend: {name}. Choose from {', '.join(TRANSCRIPTION_BACKENDS)}")
+
+    with _backend_lock:
+        if name not in _backend_instances:
+            _backend_instances[name] = TRANSCRIPTION_BACKENDS[name]()
+        return _backend_instances[name]
+
+def transcribe_audio(file_path, video_id=None, title=None, use_cache=True, backend=None):
+    """Transcribes an audio file, reusing the cached transcript if the same audio was transcribed before.
+
+    backend selects the transcription engine by name ("openai" or "local").
+    video_id and title are recorded in the cache so a later run can skip the download as well."""
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"Audio file not found: {file_path}")
+
+    audio_hash = transcript_cache.hash_file(file_path)
+    cached_transcript = transcript_cache.get_by_audio_hash(audio_hash, video_id=video_id, title=title) if use_cache else None
+    if cached_transcript is not None:
+        logger.info(f"Using cached transcript for: {file_path}")
+        return cached_transcript
+
+    transcript = _transcribe_file(file_path, get_backend(backend))
+    transcript_cache.store(transcript, audio_hash, video_id=video_id, title=title)
+    return transcript
+
+def _transcribe_file(file_path, backend):
+    """Transcribes an audio file with a backend, splitting it first if it exceeds the backend's limits."""
+    logger.info(f"Starting audio transcription with the {backend.name} backend...")
+
     try:
         # Check file size
         file_size = os.path.getsize(file_path)
-        if file_size > WHISPER_MAX_FILE_SIZE:
-            logger.warning(f"File size ({file_size/1024/1024:.2f}MB) exceeds Whisper API limit of 25MB")
-            
-            if PYDUB_AVAILABLE:
+        if backend.max_file_size and file_size > backend.max_file_size:
+            logger.warning(f"File size ({file_size/1024/1024:.2f}MB) exceeds the {backend.name} limit of {backend.max_file_size/1024/1024:.0f}MB")
+
+            if audio_splitter.FFMPEG_AVAILABLE:
                 logger.info("Attempting to split and transcribe file in chunks...")
-                return transcribe_large_file(file_path)
+                return transcribe_large_file(file_path, backend.name)
             else:
-                logger.error("File too large and pydub not available for splitting. Please use a smaller file or install pydub.")
-                raise ValueError(f"File size ({file_size/1024/1024:.2f}MB) exceeds Whisper API limit of 25MB and pydub is not available for splitting.")
-        
-        # Check if file exists and is readable
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"Audio file not found: {file_path}")
-        
-        # Whisper API supports multiple audio formats: mp3, mp4, mpeg, mpga, m4a, wav, webm
-        supported_formats = ['.mp3', '.mp4', '.mpeg', '.mpga', '.m4a', '.wav', '.webm']
-        file_ext = os.path.splitext(file_path)[1].lower()
-        
-        if file_ext not in supported_formats:
-            logger.warning(f"File format {file_ext} may not be supported by Whisper API. Attempting anyway...")
-        
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        with open(file_path, "rb") as audio_file:
-            logger.debug(f"Sending {file_path} to Whisper API")
-            response = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file
-            )
+                logger.error("File too large and ffmpeg not available for splitting. Please use a smaller file or install ffmpeg.")
+                raise ValueError(f"File size ({file_size/1024/1024:.2f}MB) exceeds the {backend.name} limit and ffmpeg is not available for splitting.")
 
-        transcript = response.text
-        logger.debug("Received transcript from Whisper API")
+        # Split long audio for backends that bound the chunk length
+        if backend.max_chunk_seconds and audio_splitter.FFMPEG_AVAILABLE:
+            duration = audio_splitter.probe_audio(file_path)["duration"]
+            if duration > backend.max_chunk_seconds:
+                logger.info(f"Audio is {duration:.0f}s long, transcribing in chunks of up to {backend.max_chunk_seconds}s...")
+                return transcribe_large_file(file_path, backend.name)
 
-        # Create transcripts directory if it doesn't exist
-        os.makedirs("transcripts", exist_ok=True)
+        # Whisper API supports multiple audio formats: flac, mp3, mp4, mpeg, mpga, m4a, ogg, oga, wav, webm
+        supported_formats = ['.flac', '.mp3', '.mp4', '.mpeg', '.mpga', '.m4a', '.ogg', '.oga', '.wav', '.webm']
+        file_ext = os.path.splitext(file_path)[1].lower()
 
-        # Build transcript filename based on audio file name
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        transcript_path = os.path.join("transcripts", f"{base_name}.txt")
+        if file_ext not in supported_formats:
+            logger.warning(f"File format {file_ext} may not be supported by Whisper. Attempting anyway...")
 
-        # Save transcript
-        with open(transcript_path, "w", encoding="utf-8") as f:
-            f.write(transcript)
+        transcript = backend.transcribe_file(file_path)
+        logger.debug(f"Received transcript from the {backend.name} backend")
 
-        logger.info(f"Transcript saved to: {transcript_path}")
-        return transcript
+        return _save_transcript(file_path, transcript)
 
     except openai.APIError as e:
         logger.error(f"OpenAI API error: {str(e)}")
@@ -81,75 +195,70 @@ def transcribe_audio(file_path):
         logger.error(f"Unexpected error during transcription: {str(e)}")
         raise
 
-def transcribe_large_file(file_path):
+def transcribe_large_file(file_path, backend=None):
     """Handle transcription of large files by splitting them into chunks."""
-    if not PYDUB_AVAILABLE:
-        raise ValueError("pydub is not available. Cannot split large files.")
-    
+    if not audio_splitter.FFMPEG_AVAILABLE:
+        raise ValueError("ffmpeg is not available. Cannot split large files.")
+
+    backend = get_backend(backend)
+
     try:
-        # Load the audio file - pydub supports multiple formats
-        file_ext = os.path.splitext(file_path)[1].lower()
-        
-        if file_ext == '.mp3':
-            audio = pydub.AudioSegment.from_mp3(file_path)
-        elif file_ext == '.m4a':
-            audio = pydub.AudioSegment.from_file(file_path, format="m4a")
-        elif file_ext == '.webm':
-            audio = pydub.AudioSegment.from_file(file_path, format="webm")
-        elif file_ext == '.mp4':
-            audio = pydub.AudioSegment.from_file(file_path, format="mp4")
-        else:
-            # Try to load with pydub's automatic format detection
-            audio = pydub.AudioSegment.from_file(file_path)
-        
-        # Calculate chunk size (20MB to leave some buffer)
-        chunk_size = 20 * 1024 * 1024
-        chunk_length_ms = int(chunk_size / (audio.frame_rate * audio.channels * audio.sample_width / 1000))
-        
-        # Split into chunks
-        chunks = []
-        for i in range(0, len(audio), chunk_length_ms):
-            chunk = audio[i:i + chunk_length_ms]
-            chunks.append(chunk)
-        
-        logger.info(f"Split audio into {len(chunks)} chunks")
-        
-        # Transcribe each chunk
-        full_transcript = []
-        client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        
-        for i, chunk in enumerate(chunks, 1):
-            # Export chunk to temporary file
-            chunk_path = f"{file_path}.chunk{i}.mp3"
-            chunk.export(chunk_path, format="mp3")
-            
-            try:
-                logger.debug(f"Transcribing chunk {i}/{len(chunks)}")
-                with open(chunk_path, "rb") as chunk_file:
-                    response = client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=chunk_file
-                    )
-                full_transcript.append(response.text)
-            finally:
-                # Clean up temporary chunk file
-                if os.path.exists(chunk_path):
-                    os.remove(chunk_path)
-        
+        # Size chunks from the encoded bitrate so each upload uses as much of the limit as is safe
+        chunk_dir = tempfile.mkdtemp(prefix="projectY_chunks_")
+        try:
+            chunk_paths = audio_splitter.split_to_fit(
+                file_path,
+                backend.max_file_size,
+                output_dir=chunk_dir,
+                max_seconds=backend.max_chunk_seconds
+            )
+
+            workers = max(1, min(backend.max_workers, len(chunk_paths)))
+            logger.info(f"Transcribing {len(chunk_paths)} chunks with up to {workers} concurrent requests")
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    utilities.submit_in_context(executor, _transcribe_chunk, backend, chunk_path, i, len(chunk_paths))
+                    for i, chunk_path in enumerate(chunk_paths, 1)
+                ]
+
+                # Collect results in chunk order regardless of completion order
+                full_transcript = [future.result() for future in futures]
+        finally:
+            # Clean up temporary chunk files
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+
         # Combine transcripts
         combined_transcript = " ".join(full_transcript)
-        
-        # Save combined transcript
-        os.makedirs("transcripts", exist_ok=True)
-        base_name = os.path.splitext(os.path.basename(file_path))[0]
-        transcript_path = os.path.join("transcripts", f"{base_name}.txt")
-        
-        with open(transcript_path, "w", encoding="utf-8") as f:
-            f.write(combined_transcript)
-        
-        logger.info(f"Large file transcript saved to: {transcript_path}")
-        return combined_transcript
-        
+        return _save_transcript(file_path, combined_transcript)
+
     except Exception as e:
         logger.error(f"Error transcribing large file: {str(e)}")
         raise
+
+def _transcribe_chunk(backend, chunk_path, index, total):
+    """Transcribe a single chunk file; backends retry their own transient failures per chunk."""
+    logger.debug(f"Transcribing chunk {index}/{total}")
+    try:
+        text = backend.transcribe_file(chunk_path)
+    except Exception as e:
+        logger.error(f"Chunk {index}/{total} failed: {str(e)}")
+        raise
+    logger.debug(f"Finished chunk {index}/{total}")
+    return text
+
+def _save_transcript(file_path, transcript):
+    """Save a transcript to transcripts/<audio name>.txt and return it."""
+    # Create transcripts directory if it doesn't exist
+    os.makedirs("transcripts", exist_ok=True)
+
+    # Build transcript filename based on audio file name
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    transcript_path = os.path.join("transcripts", f"{base_name}.txt")
+
+    # Save transcript
+    with open(transcript_path, "w", encoding="utf-8") as f:
+        f.write(transcript)
+
+    logger.info(f"Transcript saved to: {transcript_path}")
+    return transcript
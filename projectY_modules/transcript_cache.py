@@ -0,0 +1,143 @@
+"""
+Transcript cache for ProjectY.
+Stores transcripts on disk keyed by the SHA-256 of the source audio, with an
+index from YouTube video IDs to audio hashes so a known video can skip both the
+download and the transcription. Least recently used entries are evicted once the
+cache grows past its size limit.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from projectY_modules import utilities
+from projectY_modules.config import CACHE_DIR, TRANSCRIPT_CACHE_MAX_BYTES
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CACHE_DIR = os.path.join(CACHE_DIR, "transcripts")
+INDEX_PATH = os.path.join(TRANSCRIPT_CACHE_DIR, "index.json")
+
+# Serializes index updates between threads of the same process (e.g. Streamlit sessions)
+_index_lock = threading.Lock()
+
+def hash_file(file_path):
+    """Returns the SHA-256 hex digest of a file, read in blocks to keep memory flat."""
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def get_by_video_id(video_id):
+    """Returns a dict with the cached transcript and title for a video ID, or None."""
+    if not video_id:
+        return None
+
+    with _index_lock:
+        index = _load_index()
+        audio_hash = index["videos"].get(video_id)
+        entry = index["entries"].get(audio_hash) if audio_hash else None
+        transcript = _read_entry(index, audio_hash) if entry else None
+        if transcript is None:
+            logger.debug(f"Transcript cache miss for video {video_id}")
+            return None
+
+        _touch(index, audio_hash)
+        _save_index(index)
+
+    logger.info(f"Transcript cache hit for video {video_id}")
+    return {"transcript": transcript, "title": entry.get("title"), "audio_hash": audio_hash}
+
+def get_by_audio_hash(audio_hash, video_id=None, title=None):
+    """Returns the cached transcript for an audio hash, or None.
+
+    On a hit the video ID (if given) is linked to the entry so the next run can skip the download."""
+    with _index_lock:
+        index = _load_index()
+        transcript = _read_entry(index, audio_hash)
+        if transcript is None:
+            logger.debug(f"Transcript cache miss for audio {audio_hash[:12]}")
+            return None
+
+        _touch(index, audio_hash)
+        if video_id:
+            index["videos"][video_id] = audio_hash
+            if title and not index["entries"][audio_hash].get("title"):
+                index["entries"][audio_hash]["title"] = title
+        _save_index(index)
+
+    logger.info(f"Transcript cache hit for audio {audio_hash[:12]}")
+    return transcript
+
+def store(transcript, audio_hash, video_id=None, title=None):
+    """Adds a transcript to the cache and evicts old entries if the cache is over its size limit."""
+    os.makedirs(TRANSCRIPT_CACHE_DIR, exist_ok=True)
+    entry_path = os.path.join(TRANSCRIPT_CACHE_DIR, f"{audio_hash}.txt")
+
+    with _index_lock:
+        with open(entry_path, "w", encoding="utf-8") as f:
+            f.write(transcript)
+
+        index = _load_index()
+        index["entries"][audio_hash] = {
+            "size": os.path.getsize(entry_path),
+            "title": title,
+            "created": time.time(),
+            "last_used": time.time()
+        }
+        if video_id:
+            index["videos"][video_id] = audio_hash
+
+        _evict(index)
+        _save_index(index)
+
+    logger.info(f"Stored transcript in cache: {entry_path}")
+
+def _read_entry(index, audio_hash):
+    """Reads a cached transcript, dropping the index entry if its file has disappeared."""
+    if audio_hash not in index["entries"]:
+        return None
+
+    entry_path = os.path.join(TRANSCRIPT_CACHE_DIR, f"{audio_hash}.txt")
+    try:
+        with open(entry_path, "r", encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        logger.warning(f"Cached transcript missing on disk, dropping entry {audio_hash[:12]}")
+        _remove_entry(index, audio_hash)
+        _save_index(index)
+        return None
+
+def _touch(index, audio_hash):
+    index["entries"][audio_hash]["last_used"] = time.time()
+
+def _evict(index):
+    """Removes least recently used entries until the cache fits under TRANSCRIPT_CACHE_MAX_BYTES."""
+    total_size = sum(entry["size"] for entry in index["entries"].values())
+    if total_size <= TRANSCRIPT_CACHE_MAX_BYTES:
+        return
+
+    by_age = sorted(index["entries"].items(), key=lambda item: item[1]["last_used"])
+    for audio_hash, entry in by_age:
+        if total_size <= TRANSCRIPT_CACHE_MAX_BYTES:
+            break
+        logger.info(f"Evicting cached transcript {audio_hash[:12]} ({entry['size']} bytes)")
+        total_size -= entry["size"]
+        _remove_entry(index, audio_hash)
+
+def _remove_entry(index, audio_hash):
+    index["entries"].pop(audio_hash, None)
+    index["videos"] = {vid: h for vid, h in index["videos"].items() if h != audio_hash}
+
+    entry_path = os.path.join(TRANSCRIPT_CACHE_DIR, f"{audio_hash}.txt")
+    if os.path.exists(entry_path):
+        os.remove(entry_path)
+
+def _load_index():
+    return utilities.load_json(INDEX_PATH, {"entries": {}, "videos": {}})
+
+def _save_index(index):
+    utilities.save_json_atomic(INDEX_PATH, index)
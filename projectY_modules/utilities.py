@@ -1,5 +1,12 @@
 import unicodedata
 import re
+import os
+import json
+import logging
+import contextvars
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
 
 def sanitize_filename(filename):
     """Removes non-ASCII characters and special symbols from filenames."""
@@ -8,3 +15,40 @@ def sanitize_filename(filename):
     filename = re.sub(r'[-\s]+', '-', filename)  # Replace spaces with hyphens
     return filename
 
+def submit_in_context(executor, func, *args, **kwargs):
+    """Submit func to an executor so it runs in a copy of the caller's context.
+
+    Pool threads do not inherit context variables, so without this the work would
+    not count towards the caller's run (see token_budget.start_run)."""
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+def extract_video_id(url):
+    """Returns the 11-character YouTube video ID from a URL, or None if it cannot be found."""
+    if not url:
+        return None
+    match = re.search(r'(?:v=|youtu\.be/|/shorts/|/embed/|/live/|/v/)([A-Za-z0-9_-]{11})', url)
+    if match:
+        return match.group(1)
+    # A bare video ID
+    if re.fullmatch(r'[A-Za-z0-9_-]{11}', url.strip()):
+        return url.strip()
+    return None
+
+def load_json(path, default):
+    """Reads a JSON file, returning default if it is missing or unreadable."""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"Could not read {path}, starting fresh: {str(e)}")
+        return default
+
+def save_json_atomic(path, data):
+    """Writes a JSON file atomically so a concurrent reader never sees a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
@@ -0,0 +1,103 @@
+"""
+Verification cache for ProjectY.
+Stores verdicts in SQLite keyed by the normalized prediction text, so the same
+prediction (from a re-run or another video) is not sent to Perplexity again.
+TRUE and FALSE verdicts are kept until cleared; NOT YET and UNCLEAR ones expire
+after a short TTL because the outcome may have been settled since.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from projectY_modules import prediction_dedupe
+from projectY_modules.results import VerificationResult
+from projectY_modules.config import CACHE_DIR, VERIFY_CACHE_PENDING_TTL_HOURS
+
+# Set up logger for this module
+logger = logging.getLogger(__name__)
+
+VERIFICATION_CACHE_PATH = os.path.join(CACHE_DIR, "verifications.sqlite3")
+
+# Ratings that will not change once reached
+SETTLED_RATINGS = {"TRUE", "FALSE"}
+
+# Serializes writes between threads of the same process (e.g. Streamlit sessions)
+_db_lock = threading.Lock()
+
+def _connect():
+    os.makedirs(os.path.dirname(VERIFICATION_CACHE_PATH) or ".", exist_ok=True)
+    connection = sqlite3.connect(VERIFICATION_CACHE_PATH, timeout=30)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS verifications (
+            key TEXT PRIMARY KEY,
+            prediction TEXT NOT NULL,
+            actual TEXT NOT NULL,
+            rating TEXT NOT NULL,
+            verified_at REAL NOT NULL,
+            expires_at REAL
+        )
+    """)
+    return connection
+
+def cache_key(prediction):
+    """Key a prediction by its normalized text so trivially different copies share an entry."""
+    return prediction_dedupe.normalize(prediction)
+
+def get(prediction):
+    """Return the cached VerificationResult for a prediction, or None if missing or expired."""
+    key = cache_key(prediction)
+    with _db_lock:
+        connection = _connect()
+        try:
+            row = connection.execute(
+                "SELECT actual, rating, expires_at FROM verifications WHERE key = ?", (key,)
+            ).fetchone()
+        finally:
+            connection.close()
+
+    if row is None:
+        logger.debug(f"Verification cache miss: {prediction}")
+        return None
+
+    actual, rating, expires_at = row
+    if expires_at is not None and expires_at <= time.time():
+        logger.debug(f"Verification cache entry expired ({rating}): {prediction}")
+        return None
+
+    logger.info(f"Verification cache hit ({rating}): {prediction}")
+    return VerificationResult(prediction=prediction, actual=actual, rating=rating, cached=True)
+
+def store(result):
+    """Cache a verification result. Failed verifications are never cached."""
+    if result.error:
+        return
+
+    now = time.time()
+    expires_at = None if result.rating in SETTLED_RATINGS else now + VERIFY_CACHE_PENDING_TTL_HOURS * 3600
+
+    with _db_lock:
+        connection = _connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO verifications (key, prediction, actual, rating, verified_at, expires_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (cache_key(result.prediction), result.prediction, result.actual, result.rating, now, expires_at)
+                )
+        finally:
+            connection.close()
+
+def purge_expired():
+    """Delete expired entries and return how many were removed."""
+    with _db_lock:
+        connection = _connect()
+        try:
+            with connection:
+                cursor = connection.execute(
+                    "DELETE FROM verifications WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+                )
+            return cursor.rowcount
+        finally:
+            connection.close()
@@ -0,0 +1,48 @@
+from projectY_modules import prediction_store
+from projectY_modules import results
+
+import argparse
+import sys
+import time
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Search the predictions of every analyzed video.")
+    parser.add_argument("-?", action="help", help=argparse.SUPPRESS)
+    parser.add_argument("text", nargs="*", help="Words the prediction must contain (full-text search)")
+    parser.add_argument("-c", "--channel", help="Only predictions from this channel")
+    parser.add_argument("-r", "--rating", choices=results.RATINGS, type=str.upper, help="Only predictions with this rating")
+    parser.add_argument("--since", help="Only videos uploaded on or after this date (YYYY-MM-DD)")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="Maximum number of predictions to list (default: 20)")
+    parser.add_argument("--by-channel", action="store_true", help="Count the matching predictions per channel and rating instead of listing them")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    sys.stdout.reconfigure(encoding='utf-8')
+    text = " ".join(args.text) or None
+
+    started = time.perf_counter()
+    if args.by_channel:
+        counts = prediction_store.count_predictions(text, args.channel, args.rating, args.since)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for channel, ratings in counts.items():
+            breakdown = ", ".join(f"{rating}: {ratings.get(rating, 0)}" for rating in results.RATINGS)
+            print(f"{channel}: {sum(ratings.values())} predictions ({breakdown})")
+        print(f"\n{len(counts)} channels in {elapsed_ms:.1f} ms")
+        return
+
+    rows = prediction_store.search_predictions(text, args.channel, args.rating, args.since, limit=args.limit)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    for row in rows:
+        print(f"[{row['rating']}] {row['prediction']}")
+        print(f"    {row['title']} ({row['channel'] or 'Unknown channel'}, {row['upload_date'] or 'unknown date'})")
+        print(f"    {row['actual']}")
+        if row["recheck_at"]:
+            print(f"    Re-check on: {row['recheck_at']}")
+        print()
+    print(f"{len(rows)} predictions in {elapsed_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
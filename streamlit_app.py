@@ -20,11 +20,21 @@ if not os.getenv('OPENAI_API_KEY') or not os.getenv('PERPLEXITY_API_KEY'):
     st.stop()
 
 # Import your existing modules only after environment check
+from projectY_modules import config
 from projectY_modules import downloader
+from projectY_modules import audio_preprocessor
 from projectY_modules import transcriber
 from projectY_modules import prediction_extractor
 from projectY_modules import prediction_verifier
 from projectY_modules import narrative_generator
+from projectY_modules import results
+from projectY_modules import transcript_cache
+from projectY_modules import token_budget
+from projectY_modules import resilience
+from projectY_modules import hedging
+from projectY_modules import prediction_dates
+from projectY_modules import prediction_store
+from projectY_modules import utilities
 
 # Configure page
 st.set_page_config(
@@ -158,6 +168,77 @@ def main():
         # Verbose mode
         verbose = st.checkbox("Verbose output", value=False)
         
+        # Verification concurrency
+        verify_workers = st.slider(
+            "Parallel verifications",
+            min_value=1,
+            # Widened when the environment configures more than 10
+            max_value=max(10, config.VERIFY_MAX_WORKERS),
+            value=max(1, config.VERIFY_MAX_WORKERS),
+            help="Maximum number of predictions verified at the same time"
+        )
+        
+        # Predictions per verification request
+        verify_batch_size = st.slider(
+            "Predictions per verification request",
+            min_value=1,
+            max_value=max(10, config.VERIFY_BATCH_SIZE),
+            value=max(1, config.VERIFY_BATCH_SIZE),
+            help="Verify several predictions in one Perplexity request; falls back to one at a time if the reply can't be split"
+        )
+        
+        # Local pre-filter before extraction
+        prefilter = st.checkbox(
+            "Pre-filter transcript",
+            value=config.PREFILTER_ENABLED,
+            help="Only send passages with prediction cues to GPT, using far fewer tokens"
+        )
+        
+        # Verify near-duplicate predictions once
+        dedupe = st.checkbox(
+            "Merge duplicate predictions",
+            value=config.DEDUPE_ENABLED,
+            help="Verify near-identical predictions once and share the verdict"
+        )
+        
+        # Reuse earlier verdicts for the same prediction
+        verify_cache = st.checkbox(
+            "Reuse cached verdicts",
+            value=config.VERIFY_CACHE_ENABLED,
+            help="TRUE/FALSE verdicts are kept; NOT YET/UNCLEAR ones are re-checked after a short time"
+        )
+        
+        # Fast model first, reasoning model only for unsettled verdicts
+        tiered = st.checkbox(
+            "Try the fast model first",
+            value=config.VERIFY_TIERED,
+            help="Only UNCLEAR or low-confidence verdicts are escalated to the slower reasoning model"
+        )
+        
+        # Duplicate slow verification requests
+        hedge = st.checkbox(
+            "Hedge slow requests",
+            value=config.VERIFY_HEDGE_ENABLED,
+            help="Resend a verification that runs past the usual latency and use whichever answer arrives first"
+        )
+        
+        # Answer predictions about future periods without an API call
+        date_check = st.checkbox(
+            "Skip predictions about future dates",
+            value=config.DATE_CHECK_ENABLED,
+            help="Predictions about a period that has not started yet are marked NOT YET with a re-check date instead of being verified"
+        )
+        analysis_options = {
+            "verify_workers": verify_workers,
+            "verify_batch_size": verify_batch_size,
+            "prefilter": prefilter,
+            "dedupe": dedupe,
+            "verify_cache": verify_cache,
+            "tiered": tiered,
+            "hedge": hedge,
+            "date_check": date_check
+        }
+        
         # Intro file upload
         intro_file = st.file_uploader(
             "Upload intro context (optional)",
@@ -189,6 +270,46 @@ def main():
             placeholder="https://www.youtube.com/watch?v=..."
         )
         
+        source_labels = {
+            "prefer-captions": "Prefer YouTube captions, transcribe audio if none",
+            "captions": "YouTube captions only",
+            "audio": "Always transcribe audio"
+        }
+        transcript_source = st.radio(
+            "Transcript source:",
+            config.TRANSCRIPT_SOURCES,
+            index=config.TRANSCRIPT_SOURCES.index(config.TRANSCRIPT_SOURCE),
+            format_func=source_labels.get,
+            help="Captions take seconds; audio transcription takes minutes and costs more"
+        )
+        
+        # Optional preprocessing before audio is sent for transcription
+        col1, col2 = st.columns(2)
+        with col1:
+            trim_silence = st.checkbox(
+                "Trim silence before transcription",
+                value=False,
+                help="Cut long pauses so less audio is transcribed"
+            )
+        with col2:
+            speed = st.slider(
+                "Speed up audio",
+                min_value=1.0,
+                max_value=2.0,
+                value=1.0,
+                step=0.25,
+                help="Time-compress speech before transcription"
+            )
+        
+        transcription_backend = st.selectbox(
+            "Transcription engine:",
+            list(transcriber.TRANSCRIPTION_BACKENDS),
+            index=list(transcriber.TRANSCRIPTION_BACKENDS).index(config.TRANSCRIPTION_BACKEND),
+            format_func={"openai": "OpenAI Whisper API", "local": "Local CPU Whisper"}.get,
+            help="The local engine needs faster-whisper installed on the server"
+        )
+        audio_options = {"trim_silence": trim_silence, "speed": speed, "backend": transcription_backend}
+        
         if st.button("🚀 Analyze Video", type="primary"):
             if url:
                 # Check rate limit
@@ -197,7 +318,7 @@ def main():
                     st.error(f"❌ {message}")
                 else:
                     update_usage()
-                    analyze_youtube_video(url, verbose, intro_file)
+                    analyze_youtube_video(url, verbose, intro_file, analysis_options, transcript_source, audio_options)
             else:
                 st.error("Please enter a YouTube URL")
     
@@ -218,7 +339,7 @@ def main():
                     st.error(f"❌ {message}")
                 else:
                     update_usage()
-                    analyze_uploaded_transcript(uploaded_file, verbose, intro_file)
+                    analyze_uploaded_transcript(uploaded_file, verbose, intro_file, analysis_options)
             else:
                 st.error("Please upload a transcript file")
     
@@ -239,38 +360,113 @@ def main():
                     st.error(f"❌ {message}")
                 else:
                     update_usage()
-                    analyze_pasted_transcript(transcript_text, verbose, intro_file)
+                    analyze_pasted_transcript(transcript_text, verbose, intro_file, analysis_options)
             else:
                 st.error("Please paste some transcript text")
 
-def analyze_youtube_video(url, verbose, intro_file):
+def analyze_youtube_video(url, verbose, intro_file, analysis_options, transcript_source, audio_options):
     """Analyze a YouTube video"""
+    # Counters of this analysis only, so concurrent sessions do not mix their numbers
+    token_budget.start_run()
+    resilience.start_run()
+    hedging.start_run()
     try:
         with st.spinner("🔄 Processing YouTube video..."):
             # Create progress container
             progress_container = st.container()
             
-            with progress_container:
-                st.info("Step 1/4: Downloading video...")
+            # Seconds spent in each pipeline stage, stored with the analysis
+            timings = {}
+            stage_started = time.perf_counter()
             
-            # Download video
-            try:
-                audio_path = downloader.download_audio(url)
-            except Exception as e:
-                st.error(f"❌ Error downloading video: {str(e)}")
-                st.warning("💡 Tip: Try using the 'Upload Transcript' or 'Paste Transcript' options instead.")
-                return
+            # Reuse a cached transcript for this video if we have one
+            video_id = utilities.extract_video_id(url)
+            video = downloader.get_video_metadata(url)
+            cached = transcript_cache.get_by_video_id(video_id)
+            transcript = None
             
-            with progress_container:
-                st.info("Step 2/4: Transcribing audio...")
+            if cached:
+                with progress_container:
+                    st.info("Steps 1-2/4: Using cached transcript, skipping download and transcription...")
+                transcript = cached["transcript"]
+                video_title = cached["title"] or video_id
             
-            # Transcribe
-            try:
-                transcript = transcriber.transcribe_audio(audio_path)
-            except Exception as e:
-                st.error(f"❌ Error transcribing audio: {str(e)}")
-                st.warning("💡 Tip: Try using the 'Upload Transcript' or 'Paste Transcript' options instead.")
-                return
+            # Try YouTube captions before downloading any audio
+            if transcript is None and transcript_source in ("captions", "prefer-captions"):
+                with progress_container:
+                    st.info("Steps 1-2/4: Fetching YouTube captions...")
+                
+                try:
+                    captions = downloader.fetch_captions(url)
+                except Exception as e:
+                    if transcript_source == "captions":
+                        st.error(f"❌ Error fetching captions: {str(e)}")
+                        st.warning("💡 Tip: Try using the 'Upload Transcript' or 'Paste Transcript' options instead.")
+                        return
+                    # Captions are only a shortcut here; the audio can still be transcribed
+                    st.warning(f"⚠️ Could not fetch captions ({str(e)}), transcribing the audio instead")
+                    captions = None
+                
+                if captions:
+                    transcript = captions["transcript"]
+                    video_title = utilities.sanitize_filename(captions["title"])
+                elif transcript_source == "captions":
+                    st.error("❌ No captions are available for this video.")
+                    st.warning("💡 Tip: Choose a transcript source that transcribes the audio instead.")
+                    return
+                else:
+                    with progress_container:
+                        st.info("No captions available, transcribing the audio instead...")
+            
+            if transcript is None:
+                with progress_container:
+                    st.info("Step 1/4: Downloading video...")
+                
+                # Download video
+                try:
+                    audio_path = downloader.download_audio(url)
+                except Exception as e:
+                    st.error(f"❌ Error downloading video: {str(e)}")
+                    st.warning("💡 Tip: Try using the 'Upload Transcript' or 'Paste Transcript' options instead.")
+                    return
+                
+                video_title = os.path.splitext(os.path.basename(audio_path))[0]
+                
+                # Optionally trim silence and speed up before transcription
+                if audio_options["trim_silence"] or audio_options["speed"] != 1.0:
+                    with progress_container:
+                        st.info("Step 2/4: Preprocessing audio...")
+                    try:
+                        audio_path, stats = audio_preprocessor.preprocess_audio(
+                            audio_path,
+                            trim_silence=audio_options["trim_silence"],
+                            speed=audio_options["speed"]
+                        )
+                        st.caption(
+                            f"Preprocessing removed {stats['seconds_removed']:.1f}s of {stats['original_seconds']:.1f}s "
+                            f"({stats['percent_removed']:.1f}%) and {stats['bytes_removed']/1024/1024:.2f}MB"
+                        )
+                    except Exception as e:
+                        st.error(f"❌ Error preprocessing audio: {str(e)}")
+                        return
+                
+                with progress_container:
+                    st.info("Step 2/4: Transcribing audio...")
+                
+                # Transcribe
+                try:
+                    transcript = transcriber.transcribe_audio(
+                        audio_path,
+                        video_id=video_id,
+                        title=video_title,
+                        backend=audio_options["backend"]
+                    )
+                except Exception as e:
+                    st.error(f"❌ Error transcribing audio: {str(e)}")
+                    st.warning("💡 Tip: Try using the 'Upload Transcript' or 'Paste Transcript' options instead.")
+                    return
+            
+            timings["transcription"] = time.perf_counter() - stage_started
             
             with progress_container:
                 st.info("Step 3/4: Extracting predictions...")
@@ -281,47 +477,64 @@ def analyze_youtube_video(url, verbose, intro_file):
                 intro_text = intro_file.getvalue().decode('utf-8')
             
             # Extract predictions
-            predictions = prediction_extractor.extract_predictions(transcript, intro=intro_text)
+            stage_started = time.perf_counter()
+            predictions = prediction_extractor.extract_predictions(
+                transcript,
+                intro=intro_text,
+                prefilter=analysis_options["prefilter"]
+            )
+            timings["extraction"] = time.perf_counter() - stage_started
             
             with progress_container:
                 st.info("Step 4/4: Verifying predictions...")
             
             # Verify predictions
-            verified_results = {}
-            for prediction in predictions:
-                gpt_response = prediction_verifier.verify_prediction_with_perplexity(prediction)
-                
-                actual_result = "Not found"
-                rating = "UNCLEAR"
-                
-                for line in gpt_response.splitlines():
-                    if line.strip().lower().startswith("actual result:"):
-                        actual_result = line.split(":", 1)[1].strip()
-                    elif line.strip().lower().startswith("rating:"):
-                        rating = line.split(":", 1)[1].strip()
-                
-                verified_results[prediction] = {
-                    "actual": actual_result,
-                    "rating": rating
-                }
+            stage_started = time.perf_counter()
+            verification_results = prediction_verifier.verify_predictions(
+                predictions,
+                max_workers=analysis_options["verify_workers"],
+                dedupe=analysis_options["dedupe"],
+                use_cache=analysis_options["verify_cache"],
+                batch_size=analysis_options["verify_batch_size"],
+                tiered=analysis_options["tiered"],
+                hedge=analysis_options["hedge"],
+                date_check=analysis_options["date_check"],
+                reference_date=prediction_dates.parse_upload_date(video and video.get("upload_date"))
+            )
+            timings["verification"] = time.perf_counter() - stage_started
             
             # Generate narrative
-            video_title = os.path.splitext(os.path.basename(audio_path))[0]
+            stage_started = time.perf_counter()
             narrative = narrative_generator.generate_narrative(
                 video_title=video_title,
                 intro_text=intro_text,
-                verified_results=verified_results
+                verified_results=verification_results,
+                video=video
+            )
+            timings["narrative"] = time.perf_counter() - stage_started
+            
+            # Keep the analysis so its open predictions can be re-checked later
+            prediction_store.save_analysis(
+                prediction_store.video_key(video_id, transcript),
+                video_title,
+                verification_results,
+                narrative=narrative,
+                video=video,
+                intro_text=intro_text,
+                transcript=transcript,
+                timings=timings,
+                prefiltered=analysis_options["prefilter"]
             )
             
             # Display results
-            display_results(verified_results, narrative, transcript)
+            display_results(verification_results, narrative, transcript)
             
     except Exception as e:
         st.error(f"❌ Error processing video: {str(e)}")
         if verbose:
             st.exception(e)
 
-def analyze_uploaded_transcript(uploaded_file, verbose, intro_file):
+def analyze_uploaded_transcript(uploaded_file, verbose, intro_file, analysis_options):
     """Analyze an uploaded transcript file"""
     try:
         with st.spinner("🔄 Processing uploaded transcript..."):
@@ -334,14 +547,14 @@ def analyze_uploaded_transcript(uploaded_file, verbose, intro_file):
                 intro_text = intro_file.getvalue().decode('utf-8')
             
             # Process transcript
-            process_transcript(transcript, intro_text, verbose, "Uploaded Transcript")
+            process_transcript(transcript, intro_text, verbose, "Uploaded Transcript", analysis_options)
             
     except Exception as e:
         st.error(f"❌ Error processing transcript: {str(e)}")
         if verbose:
             st.exception(e)
 
-def analyze_pasted_transcript(transcript_text, verbose, intro_file):
+def analyze_pasted_transcript(transcript_text, verbose, intro_file, analysis_options):
     """Analyze pasted transcript text"""
     try:
         with st.spinner("🔄 Processing pasted transcript..."):
@@ -351,58 +564,81 @@ def analyze_pasted_transcript(transcript_text, verbose, intro_file):
                 intro_text = intro_file.getvalue().decode('utf-8')
             
             # Process transcript
-            process_transcript(transcript_text, intro_text, verbose, "Pasted Transcript")
+            process_transcript(transcript_text, intro_text, verbose, "Pasted Transcript", analysis_options)
             
     except Exception as e:
         st.error(f"❌ Error processing transcript: {str(e)}")
         if verbose:
             st.exception(e)
 
-def process_transcript(transcript, intro_text, verbose, video_title):
+def process_transcript(transcript, intro_text, verbose, video_title, analysis_options):
     """Process transcript and display results"""
+    # Counters of this analysis only, so concurrent sessions do not mix their numbers
+    token_budget.start_run()
+    resilience.start_run()
+    hedging.start_run()
+    # Seconds spent in each pipeline stage, stored with the analysis
+    timings = {}
+    
     # Extract predictions
-    predictions = prediction_extractor.extract_predictions(transcript, intro=intro_text)
+    stage_started = time.perf_counter()
+    predictions = prediction_extractor.extract_predictions(
+        transcript,
+        intro=intro_text,
+        prefilter=analysis_options["prefilter"]
+    )
+    timings["extraction"] = time.perf_counter() - stage_started
     
     # Verify predictions
-    verified_results = {}
-    for prediction in predictions:
-        gpt_response = prediction_verifier.verify_prediction_with_perplexity(prediction)
-        
-        actual_result = "Not found"
-        rating = "UNCLEAR"
-        
-        for line in gpt_response.splitlines():
-            if line.strip().lower().startswith("actual result:"):
-                actual_result = line.split(":", 1)[1].strip()
-            elif line.strip().lower().startswith("rating:"):
-                rating = line.split(":", 1)[1].strip()
-        
-        verified_results[prediction] = {
-            "actual": actual_result,
-            "rating": rating
-        }
+    stage_started = time.perf_counter()
+    verification_results = prediction_verifier.verify_predictions(
+        predictions,
+        max_workers=analysis_options["verify_workers"],
+        dedupe=analysis_options["dedupe"],
+        use_cache=analysis_options["verify_cache"],
+        batch_size=analysis_options["verify_batch_size"],
+        tiered=analysis_options["tiered"],
+        hedge=analysis_options["hedge"],
+        date_check=analysis_options["date_check"]
+    )
+    timings["verification"] = time.perf_counter() - stage_started
     
     # Generate narrative
+    stage_started = time.perf_counter()
     narrative = narrative_generator.generate_narrative(
         video_title=video_title,
         intro_text=intro_text,
-        verified_results=verified_results
+        verified_results=verification_results
+    )
+    timings["narrative"] = time.perf_counter() - stage_started
+    
+    # Keep the analysis so its open predictions can be re-checked later
+    prediction_store.save_analysis(
+        prediction_store.video_key(transcript=transcript),
+        video_title,
+        verification_results,
+        narrative=narrative,
+        intro_text=intro_text,
+        transcript=transcript,
+        timings=timings,
+        prefiltered=analysis_options["prefilter"]
     )
     
     # Display results
-    display_results(verified_results, narrative, transcript)
+    display_results(verification_results, narrative, transcript)
 
-def display_results(verified_results, narrative, transcript):
+def display_results(verification_results, narrative, transcript):
     """Display analysis results"""
     st.markdown('<h3 class="sub-header">📊 Analysis Results</h3>', unsafe_allow_html=True)
     
     # Summary statistics
     col1, col2, col3, col4 = st.columns(4)
     
-    total_predictions = len(verified_results)
-    true_count = sum(1 for details in verified_results.values() if details.get('rating') == 'TRUE')
-    false_count = sum(1 for details in verified_results.values() if details.get('rating') == 'FALSE')
-    unclear_count = sum(1 for details in verified_results.values() if details.get('rating') in ['UNCLEAR', 'NOT YET'])
+    rating_counts = results.count_ratings(verification_results)
+    total_predictions = len(verification_results)
+    true_count = rating_counts['TRUE']
+    false_count = rating_counts['FALSE']
+    unclear_count = rating_counts['UNCLEAR'] + rating_counts['NOT YET']
     
     with col1:
         st.metric("Total Predictions", total_predictions)
@@ -413,20 +649,29 @@ def display_results(verified_results, narrative, transcript):
     with col4:
         st.metric("Unclear/Not Yet", unclear_count)
     
+    cache_hits, cache_misses = results.count_cache_hits(verification_results)
+    st.caption(f"Verification cache: {cache_hits} hits, {cache_misses} misses")
+    st.caption(f"Settled by model: {results.format_model_counts(results.count_models(verification_results))}")
+    hedge_stats = hedging.stats_summary()
+    if hedge_stats["calls"]:
+        st.caption(f"Hedging: {hedging.format_stats(hedge_stats)}")
+    
     # Predictions details
     st.markdown('<h4>🔍 Predictions Analysis</h4>', unsafe_allow_html=True)
     
-    for i, (prediction, details) in enumerate(verified_results.items(), 1):
-        with st.expander(f"Prediction {i}: {prediction[:100]}..."):
+    for i, result in enumerate(verification_results, 1):
+        with st.expander(f"Prediction {i}: {result.prediction[:100]}..."):
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                st.write("**Prediction:**", prediction)
-                st.write("**Actual Result:**", details.get('actual', 'N/A'))
-                st.write("**Rating:**", details.get('rating', 'N/A'))
+                st.write("**Prediction:**", result.prediction)
+                st.write("**Actual Result:**", result.actual)
+                st.write("**Rating:**", result.rating)
+                if result.recheck_at:
+                    st.write("**Re-check on:**", result.recheck_at)
             
             with col2:
-                rating = details.get('rating', 'UNCLEAR')
+                rating = result.rating
                 if rating == 'TRUE':
                     st.success("✅ TRUE")
                 elif rating == 'FALSE':
@@ -438,6 +683,25 @@ def display_results(verified_results, narrative, transcript):
     st.markdown('<h4>📖 Generated Narrative</h4>', unsafe_allow_html=True)
     st.markdown(f'<div class="result-box">{narrative}</div>', unsafe_allow_html=True)
     
+    # Tokens used by this analysis
+    usage = token_budget.usage_summary()
+    with st.expander(
+        f"🔢 Token usage: {usage['prompt_tokens']} prompt + {usage['completion_tokens']} completion tokens "
+        f"({usage['cache_hit_percent']:.0f}% prompt cache hits)"
+    ):
+        for model, totals in usage["models"].items():
+            st.write(
+                f"**{model}:** {totals['calls']} calls, {totals['prompt_tokens']} prompt "
+                f"({totals['cached_tokens']} cached) + {totals['completion_tokens']} completion tokens"
+            )
+    
+    # Retries and throttling during this analysis
+    retry_stats = resilience.stats_summary()
+    total_retries = sum(totals["retries"] for totals in retry_stats.values())
+    throttle_seconds = sum(totals["throttle_seconds"] for totals in retry_stats.values())
+    with st.expander(f"🔁 API retries: {total_retries} ({throttle_seconds:.1f}s lost to throttling)"):
+        st.text(resilience.format_stats(retry_stats))
+    
     # Download results
     st.markdown('<h4>💾 Download Results</h4>', unsafe_allow_html=True)
     
@@ -453,12 +717,12 @@ Unclear/Not Yet: {unclear_count}
 DETAILED PREDICTIONS:
 """
     
-    for i, (prediction, details) in enumerate(verified_results.items(), 1):
+    for i, result in enumerate(verification_results, 1):
         results_text += f"""
 Prediction {i}:
-- Prediction: {prediction}
-- Actual Result: {details.get('actual', 'N/A')}
-- Rating: {details.get('rating', 'N/A')}
+- Prediction: {result.prediction}
+- Actual Result: {result.actual}
+- Rating: {result.rating}
 """
     
     results_text += f"""